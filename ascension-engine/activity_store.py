@@ -0,0 +1,206 @@
+"""
+activity_store.py
+Per-user activity feed, kept outside the user records.
+
+Every user gets a fixed-size ring buffer of ACTIVITY_CAPACITY entries
+in one SQLite table (storage/activity.sqlite3):
+- entry number `seq` lives in slot seq % capacity, so an append writes
+  one row (overwriting the oldest once full) plus the head counter
+- each entry has a small type code (KINDS); indexes on (user, seq) and
+  (user, kind, seq) serve page() with an index range scan
+- page() is cursor-based (entries older / newer than a seq), so a page
+  costs O(page size) however deep the user scrolls, filtered or not
+- the capacity the slots were laid out with is stored in activity_meta;
+  opening the store with a different capacity re-slots every feed (the
+  newest entries are kept), so changing ACTIVITY_CAPACITY is safe
+User records no longer carry the log, so a user write stays small.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+ACTIVITY_CAPACITY = int(os.getenv("ACTIVITY_CAPACITY", "500"))
+
+# Entry type codes (stored as the small int)
+KINDS = {"other": 0, "grind": 1, "game": 2, "badge": 3, "rank": 4, "settings": 5}
+KIND_NAMES = {code: name for name, code in KINDS.items()}
+
+
+class ActivityStore:
+    def __init__(self, path, capacity=ACTIVITY_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self._local = threading.local()
+        self._write_lock = threading.Lock()  # head read + bump is one step
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS activity ("
+            " user_id INTEGER NOT NULL,"
+            " slot INTEGER NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " time INTEGER NOT NULL,"
+            " text TEXT NOT NULL,"
+            " kind INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (user_id, slot)"
+            ") WITHOUT ROWID"
+        )
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(activity)")]
+        if "kind" not in columns:
+            conn.execute("ALTER TABLE activity ADD COLUMN kind INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS activity_seq ON activity (user_id, seq)")
+        conn.execute("CREATE INDEX IF NOT EXISTS activity_kind ON activity (user_id, kind, seq)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS activity_head ("
+            " user_id INTEGER PRIMARY KEY,"
+            " seq INTEGER NOT NULL"
+            ")"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS activity_meta ("
+            " key TEXT PRIMARY KEY,"
+            " value INTEGER NOT NULL"
+            ")"
+        )
+        conn.commit()
+        self._check_capacity(conn)
+
+    def _check_capacity(self, conn):
+        """Re-slot the stored feeds if they were laid out for another capacity."""
+        row = conn.execute(
+            "SELECT value FROM activity_meta WHERE key = 'capacity'"
+        ).fetchone()
+        if row and row[0] == self.capacity:
+            return
+
+        with conn:
+            # Keep each user's newest `capacity` entries...
+            conn.execute(
+                "DELETE FROM activity WHERE seq <= ("
+                " SELECT seq FROM activity_head WHERE activity_head.user_id = activity.user_id"
+                ") - ?", (self.capacity,)
+            )
+            # ...and move them to their new slots (via unique negative slots,
+            # so no intermediate row collides on (user_id, slot))
+            conn.execute("UPDATE activity SET slot = -1 - seq")
+            conn.execute("UPDATE activity SET slot = seq % ?", (self.capacity,))
+            conn.execute(
+                "INSERT INTO activity_meta (key, value) VALUES ('capacity', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (self.capacity,)
+            )
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections are not shareable)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _head(self, conn, user_id):
+        row = conn.execute(
+            "SELECT seq FROM activity_head WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    # ---------------------------------------------------------
+    # WRITE
+    # ---------------------------------------------------------
+    def append(self, user_id, text, kind="other", when=None):
+        """Add one entry (newest)."""
+        self.append_many(user_id, [(when or int(time.time()), text, kind)])
+
+    def append_many(self, user_id, entries):
+        """Add [(time, text, kind), ...] given oldest first."""
+        entries = entries[-self.capacity:]
+        if not entries:
+            return
+
+        conn = self._conn()
+        with self._write_lock, conn:
+            seq = self._head(conn, user_id)
+            rows = []
+            for when, text, kind in entries:
+                seq += 1
+                rows.append((user_id, seq % self.capacity, seq, when, text, KINDS.get(kind, 0)))
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO activity (user_id, slot, seq, time, text, kind) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            conn.execute(
+                "INSERT INTO activity_head (user_id, seq) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET seq = excluded.seq",
+                (user_id, seq)
+            )
+
+    # ---------------------------------------------------------
+    # READ
+    # ---------------------------------------------------------
+    def page(self, user_id, per_page, before=None, after=None, kind=None):
+        """
+        One page, newest first, as [{"seq", "time", "kind", "text"}].
+        before=seq → the entries just older than it (None → newest page);
+        after=seq  → the entries just newer than it; kind filters by type.
+        Returns (entries, older_cursor, newer_cursor); a cursor is None
+        when there is nothing further that way.
+        """
+        where = "user_id = ?"
+        params = [user_id]
+        if kind is not None:
+            where += " AND kind = ?"
+            params.append(KINDS[kind])
+
+        if after is not None:
+            rows = self._conn().execute(
+                f"SELECT seq, time, kind, text FROM activity WHERE {where} AND seq > ? "
+                "ORDER BY seq ASC LIMIT ?", (*params, after, per_page + 1)
+            ).fetchall()
+            more_newer, more_older = len(rows) > per_page, True
+            rows = rows[:per_page][::-1]
+        else:
+            if before is not None:
+                where += " AND seq < ?"
+                params.append(before)
+            rows = self._conn().execute(
+                f"SELECT seq, time, kind, text FROM activity WHERE {where} "
+                "ORDER BY seq DESC LIMIT ?", (*params, per_page + 1)
+            ).fetchall()
+            more_newer, more_older = before is not None, len(rows) > per_page
+            rows = rows[:per_page]
+
+        entries = [
+            {"seq": seq, "time": t, "kind": KIND_NAMES.get(code, "other"), "text": text}
+            for seq, t, code, text in rows
+        ]
+        if not entries:
+            return [], None, None
+        return (
+            entries,
+            entries[-1]["seq"] if more_older else None,
+            entries[0]["seq"] if more_newer else None,
+        )
+
+    def clear(self, user_id):
+        """Drop a user's whole feed."""
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.execute("DELETE FROM activity WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM activity_head WHERE user_id = ?", (user_id,))
+
+    def count(self, user_id):
+        # Not min(head, capacity): a capacity change can drop old entries
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM activity WHERE user_id = ?", (user_id,)
+        ).fetchone()[0]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
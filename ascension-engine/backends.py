@@ -0,0 +1,682 @@
+"""
+backends.py
+Storage engines behind the database.py API.
+
+Engines:
+- JsonBackend    → whole database in one JSON file (legacy layout)
+- JournalBackend → JSON snapshot + append-only mutation log (WAL)
+- SqliteBackend  → one row per user, read and written individually
+
+Every engine stores plain JSON-compatible values under string keys
+(Telegram user ids, plus a few bookkeeping keys like "next_reset").
+
+Whole-database snapshots (json engine file, journal snapshot, imports)
+go through a selectable codec, detected again on load:
+- "json"    → indented JSON (human-readable, slowest, largest)
+- "compact" → JSON without whitespace
+- "binary"  → pickle protocol 5 behind a magic header. Keys and short
+              strings are interned before dumping, so each repeated one
+              is written once and referenced after that; small ints take
+              two bytes. Loading refuses anything but plain containers.
+"""
+
+import io
+import os
+import re
+import copy
+import glob
+import sys
+import json
+import pickle
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------
+# SNAPSHOT CODECS
+# ---------------------------------------------------------
+BINARY_MAGIC = b"ASCNSNP1"
+
+
+class _PlainUnpickler(pickle.Unpickler):
+    """Only dicts / lists / strings / numbers: never import or call anything."""
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"Snapshot refers to {module}.{name}; refusing to load")
+
+
+def _dump_json(data, f):
+    f.write(json.dumps(data, indent=4).encode())
+
+
+def _dump_compact(data, f):
+    f.write(json.dumps(data, separators=(",", ":")).encode())
+
+
+# Strings up to this length are shared when repeated (field names, ranks,
+# dates, badge names); longer ones are assumed to be unique
+BINARY_SHARED_STR = 32
+
+
+def _shared(value):
+    """
+    Copy of `value` whose repeated short strings are one object each.
+    Pickle's memo deduplicates by identity, not value: records decoded
+    one by one (the journal engine, sqlite rows) never share key
+    objects, so without this every record would repeat its keys.
+    """
+    if isinstance(value, dict):
+        return {sys.intern(k) if type(k) is str else k: _shared(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_shared(v) for v in value]
+    if type(value) is str and len(value) <= BINARY_SHARED_STR:
+        return sys.intern(value)
+    return value
+
+
+def _dump_binary(data, f):
+    f.write(BINARY_MAGIC)
+    pickle.dump(_shared(data), f, protocol=5)
+
+
+SNAPSHOT_CODECS = {
+    "json": _dump_json,
+    "compact": _dump_compact,
+    "binary": _dump_binary,
+}
+
+
+def detect_codec(raw):
+    """Codec name of snapshot bytes ("json" covers both JSON layouts)."""
+    return "binary" if raw[:len(BINARY_MAGIC)] == BINARY_MAGIC else "json"
+
+
+def load_snapshot(path):
+    """Read a snapshot file written with any codec."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if detect_codec(raw) == "binary":
+        return _PlainUnpickler(io.BytesIO(raw[len(BINARY_MAGIC):])).load()
+    return json.loads(raw)
+
+
+class _JsonObjectStream:
+    """
+    (key, value) pairs of a JSON object file, read in chunks: only one
+    top-level value is decoded and held at a time.
+    """
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        """Next non-space character (not consumed); "" at end of file."""
+        while True:
+            self.pos = _JSON_SPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars):
+        c = self._peek()
+        if not c or c not in chars:
+            raise ValueError(f"Malformed snapshot: expected one of {chars!r}, got {c!r}")
+        self.pos += 1
+        return c
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _JSON_DECODER.raw_decode(self.buf, self.pos)
+                # A number is only complete once a delimiter follows it
+                # ("-1" may be the start of "-1.5e10" in the next chunk)
+                complete = end < len(self.buf) and (
+                    type(value) not in (int, float) or self.buf[end] in " \t\r\n,}]"
+                )
+                if complete or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def __iter__(self):
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            yield key, self._value()
+            if self._expect(",}") == "}":
+                return
+
+
+_JSON_DECODER = json.JSONDecoder()
+_JSON_SPACE = re.compile(r"[ \t\r\n]*")
+
+
+def stream_snapshot(path, chunk_size=1 << 16):
+    """
+    Yield a snapshot's top-level (key, value) pairs one at a time.
+    JSON snapshots are parsed incrementally; binary ones are loaded whole.
+    """
+    with open(path, "rb") as f:
+        binary = detect_codec(f.read(len(BINARY_MAGIC))) == "binary"
+    if binary:
+        yield from load_snapshot(path).items()
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        yield from _JsonObjectStream(f, chunk_size)
+
+
+def write_snapshot(path, data, codec="compact"):
+    """Write a snapshot atomically (temp file + fsync + rename)."""
+    try:
+        dump = SNAPSHOT_CODECS[codec]
+    except KeyError:
+        raise ValueError(f"Unknown snapshot codec '{codec}' (choose from: {', '.join(SNAPSHOT_CODECS)})")
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+# ---------------------------------------------------------
+# JSON FILE ENGINE (legacy)
+# ---------------------------------------------------------
+class JsonBackend:
+    """
+    Whole-file JSON storage. Every write rewrites the entire dataset.
+    Writes are serialized by one global lock: each is a read-modify-write
+    of the whole file, so two at once would drop each other's changes.
+    """
+
+    name = "json"
+
+    def __init__(self, path, codec="compact"):
+        self.path = path
+        self.codec = codec
+        self._write_lock = threading.RLock()
+
+        # If JSON database does not exist → create empty
+        if not os.path.exists(path):
+            self.save_all({})
+
+    def load_all(self):
+        try:
+            return load_snapshot(self.path)
+        except Exception:
+            return {}
+
+    def save_all(self, db):
+        with self._write_lock:
+            # Temporary file + atomic replace (prevents corruption)
+            write_snapshot(self.path, db, self.codec)
+
+    def get(self, key):
+        return self.load_all().get(key)
+
+    def iter_records(self):
+        """Stream (key, value) pairs without loading the whole file."""
+        try:
+            yield from stream_snapshot(self.path)
+        except FileNotFoundError:
+            return
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    def put_many(self, items):
+        with self._write_lock:
+            db = self.load_all()
+            db.update(items)
+            self.save_all(db)
+
+    def delete(self, key):
+        with self._write_lock:
+            db = self.load_all()
+            if db.pop(key, None) is not None:
+                self.save_all(db)
+
+    def keys(self):
+        return list(self.load_all().keys())
+
+    def close(self):
+        pass
+
+
+# ---------------------------------------------------------
+# JOURNALED JSON ENGINE (snapshot + write-ahead log)
+# ---------------------------------------------------------
+SNAPSHOT_SEQ_KEY = "__journal_seq__"
+
+
+def diff_record(old, new, path=()):
+    """
+    Compact list of ops turning `old` into `new`:
+      ["=", path, value]        set a field
+      ["+", path, delta]        add to an integer counter (xp, grinds…)
+      ["x", path]               delete a field
+      ["a", path, items]        append to a list (badge add)
+      ["p", path, items, cap]   prepend to a list and cap it (activity log)
+    """
+    ops = []
+
+    for key in old.keys() - new.keys():
+        ops.append(["x", [*path, key]])
+
+    for key, value in new.items():
+        p = [*path, key]
+
+        if key not in old:
+            ops.append(["=", p, value])
+            continue
+
+        prev = old[key]
+        if prev == value and type(prev) is type(value):
+            continue
+
+        if type(prev) is dict and type(value) is dict:
+            ops.extend(diff_record(prev, value, p))
+        elif type(prev) is int and type(value) is int:
+            ops.append(["+", p, value - prev])
+        elif type(prev) is list and type(value) is list:
+            ops.append(_diff_list(p, prev, value))
+        else:
+            ops.append(["=", p, value])
+
+    return ops
+
+
+def _diff_list(path, prev, value):
+    # Append: [a, b] → [a, b, c]
+    if len(value) > len(prev) and value[:len(prev)] == prev:
+        return ["a", path, value[len(prev):]]
+
+    # Prepend + cap: [b, c, d] → [a, b, c]
+    for n in range(1, min(len(value), 16) + 1):
+        if value[n:] == prev[:len(value) - n]:
+            return ["p", path, value[:n], len(value)]
+
+    return ["=", path, value]
+
+
+def apply_ops(record, ops):
+    """Replay ops produced by diff_record() onto `record` (in place)."""
+    for op in ops:
+        kind, path = op[0], op[1]
+        parent = record
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        key = path[-1]
+
+        if kind == "=":
+            parent[key] = op[2]
+        elif kind == "+":
+            parent[key] = parent.get(key, 0) + op[2]
+        elif kind == "x":
+            parent.pop(key, None)
+        elif kind == "a":
+            parent.setdefault(key, []).extend(op[2])
+        elif kind == "p":
+            parent[key] = (op[2] + parent.get(key, []))[:op[3]]
+
+    return record
+
+
+class JournalBackend:
+    """
+    Journaled JSON storage.
+
+    Each write appends one compact line per changed record to
+    `<path>.wal` ({"s": seq, "k": key, "o": ops}), so write cost follows
+    the size of the change, not the size of the database. Lines written
+    in one batch share a single fsync (group commit).
+
+    A background compactor folds the log into the JSON snapshot once it
+    grows past `compact_bytes`; on startup the snapshot is loaded and the
+    log tail after the snapshot's sequence number is replayed.
+    """
+
+    name = "journal"
+
+    def __init__(self, path, compact_bytes=4 * 1024 * 1024, compact_check_ms=1000, codec="compact"):
+        self.path = path
+        self.wal_path = path + ".wal"
+        self.compact_bytes = compact_bytes
+        self.codec = codec
+
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._data = {}
+        self._seq = 0
+
+        self._recover()
+        self._wal = open(self.wal_path, "a")
+
+        self._stop = threading.Event()
+        self._compactor = threading.Thread(
+            target=self._compact_loop, args=(compact_check_ms / 1000,),
+            name="journal-compactor", daemon=True
+        )
+        self._compactor.start()
+
+    # ---------- startup ----------
+    def _recover(self):
+        snapshot = {}
+        if os.path.exists(self.path):
+            try:
+                snapshot = load_snapshot(self.path)
+            except Exception:
+                logger.error("Journal snapshot unreadable, starting from empty state")
+
+        snap_seq = snapshot.pop(SNAPSHOT_SEQ_KEY, 0)
+        self._data = snapshot
+        self._seq = snap_seq
+
+        # Rotated segments (left by an interrupted compaction) come first
+        for segment in self._segments() + [self.wal_path]:
+            if os.path.exists(segment):
+                self._replay(segment, snap_seq)
+
+    def _segments(self):
+        return sorted(
+            glob.glob(self.wal_path + ".*"),
+            key=lambda p: int(p.rsplit(".", 1)[1])
+        )
+
+    def _replay(self, wal_path, snap_seq):
+        with open(wal_path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn tail from a crash mid-append: nothing after it is valid
+                    logger.warning(f"Journal {wal_path}: ignoring torn record")
+                    break
+
+                if entry["s"] <= snap_seq:
+                    continue
+
+                self._apply_entry(entry)
+                self._seq = entry["s"]
+
+    def _apply_entry(self, entry):
+        key = entry["k"]
+        if entry.get("d"):
+            self._data.pop(key, None)
+        elif "v" in entry:
+            self._data[key] = entry["v"]
+        else:
+            # Records are replaced, never mutated, so snapshots can share them
+            self._data[key] = apply_ops(copy.deepcopy(self._data.get(key, {})), entry["o"])
+
+    # ---------- writes ----------
+    def _append(self, entries):
+        lines = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries)
+        self._wal.write(lines)
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+
+    def _entry_for(self, key, value):
+        """Log entry for a write, or None if nothing changed."""
+        prev = self._data.get(key)
+        if isinstance(prev, dict) and isinstance(value, dict):
+            ops = diff_record(prev, value)
+            return {"k": key, "o": ops} if ops else None
+        return {"k": key, "v": value}
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    def put_many(self, items):
+        with self._lock:
+            entries = []
+            for key, value in items.items():
+                # Private copy: callers keep mutating their dicts
+                value = json.loads(json.dumps(value))
+                entry = self._entry_for(key, value)
+                if entry is None:
+                    continue
+
+                self._seq += 1
+                entry["s"] = self._seq
+                self._data[key] = value
+                entries.append(entry)
+
+            if entries:
+                self._append(entries)
+
+    def delete(self, key):
+        with self._lock:
+            if key not in self._data:
+                return
+            self._seq += 1
+            self._data.pop(key)
+            self._append([{"s": self._seq, "k": key, "d": 1}])
+
+    # ---------- reads ----------
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+        return copy.deepcopy(value)
+
+    def keys(self):
+        with self._lock:
+            return list(self._data.keys())
+
+    def iter_records(self):
+        """(key, value) pairs, one private copy at a time."""
+        for key in self.keys():
+            with self._lock:
+                value = self._data.get(key)
+            if value is not None:
+                yield key, copy.deepcopy(value)
+
+    def load_all(self):
+        with self._lock:
+            return copy.deepcopy(self._data)
+
+    def save_all(self, db):
+        with self._compact_lock, self._lock:
+            self._data = json.loads(json.dumps(db))
+            self._seq += 1
+            self._write_snapshot(self._data, self._seq)
+            self._wal.close()
+            self._wal = open(self.wal_path, "w")
+
+    # ---------- compaction ----------
+    def _compact_loop(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                if os.path.getsize(self.wal_path) >= self.compact_bytes:
+                    self.compact()
+            except Exception as e:
+                logger.error(f"Journal compaction failed: {e}")
+
+    def compact(self):
+        """Fold the log into a fresh snapshot and drop the folded log."""
+        with self._compact_lock:
+            with self._lock:
+                # Rotate the log; new writes go to a fresh file meanwhile
+                seq = self._seq
+                data = dict(self._data)
+                self._wal.close()
+                segment = f"{self.wal_path}.{seq}"
+                os.replace(self.wal_path, segment)
+                self._wal = open(self.wal_path, "a")
+
+            # Heavy part runs without blocking writers
+            self._write_snapshot(data, seq)
+            os.remove(segment)
+
+    def _write_snapshot(self, data, seq):
+        write_snapshot(self.path, {**data, SNAPSHOT_SEQ_KEY: seq}, self.codec)
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._wal.close()
+
+
+# ---------------------------------------------------------
+# SQLITE ENGINE (one row per record)
+# ---------------------------------------------------------
+class SqliteBackend:
+    """
+    SQLite storage with one row per key.
+    A get/put touches exactly one row, so the cost of a button press
+    no longer depends on how many users exist.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " key TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL"
+            ")"
+        )
+        conn.commit()
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections are not shareable)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load_all(self):
+        rows = self._conn().execute("SELECT key, data FROM records")
+        return {key: json.loads(data) for key, data in rows}
+
+    def save_all(self, db):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM records")
+            conn.executemany(
+                "INSERT INTO records (key, data) VALUES (?, ?)",
+                ((key, json.dumps(value, separators=(",", ":"))) for key, value in db.items())
+            )
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT data FROM records WHERE key = ?", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, value):
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO records (key, data) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET data = excluded.data",
+                (key, json.dumps(value, separators=(",", ":")))
+            )
+
+    def put_many(self, items):
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT INTO records (key, data) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET data = excluded.data",
+                ((key, json.dumps(value, separators=(",", ":"))) for key, value in items.items())
+            )
+
+    def delete(self, key):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM records WHERE key = ?", (key,))
+
+    def keys(self):
+        return [row[0] for row in self._conn().execute("SELECT key FROM records")]
+
+    def iter_records(self, batch_size=500):
+        """(key, value) pairs in key order, fetched batch_size rows at a time."""
+        last = ""
+        while True:
+            rows = self._conn().execute(
+                "SELECT key, data FROM records WHERE key > ? ORDER BY key LIMIT ?",
+                (last, batch_size)
+            ).fetchall()
+            if not rows:
+                return
+            for key, data in rows:
+                yield key, json.loads(data)
+            last = rows[-1][0]
+
+    def is_empty(self):
+        return self._conn().execute("SELECT 1 FROM records LIMIT 1").fetchone() is None
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# ---------------------------------------------------------
+# ENGINE FACTORY
+# ---------------------------------------------------------
+BACKENDS = {
+    "json": JsonBackend,
+    "journal": JournalBackend,
+    "sqlite": SqliteBackend,
+}
+
+
+def create_backend(name, path, **options):
+    """Instantiate the storage engine registered under `name`."""
+    try:
+        cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown DB_BACKEND '{name}' (choose from: {', '.join(BACKENDS)})")
+    return cls(path, **options)
+
+
+# ---------------------------------------------------------
+# ONE-SHOT IMPORTER: JSON FILE → ANY ENGINE
+# ---------------------------------------------------------
+def import_json_file(json_path, target):
+    """
+    Copy every record from a legacy database.json into `target`.
+    Returns the number of imported records.
+    """
+    db = load_snapshot(json_path)
+
+    target.put_many(db)
+    return len(db)
@@ -1,10 +1,42 @@
 import os
-import json
+import copy
 import time
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+from backends import create_backend, import_json_file
+from activity_store import ActivityStore
+from user_record import UserRecord
 
 # Storage folder
 STORAGE_DIR = "storage"
 DB_PATH = os.path.join(STORAGE_DIR, "database.json")
+SQLITE_PATH = os.path.join(STORAGE_DIR, "database.sqlite3")
+ACTIVITY_PATH = os.path.join(STORAGE_DIR, "activity.sqlite3")
+
+# Storage engine: "sqlite" (one row per user), "journal" (JSON snapshot +
+# append-only log) or "json" (legacy single file)
+DB_BACKEND = os.getenv("DB_BACKEND", "sqlite")
+
+# Journal engine: fold the log into the snapshot once it reaches this size
+JOURNAL_COMPACT_BYTES = int(os.getenv("JOURNAL_COMPACT_BYTES", str(4 * 1024 * 1024)))
+
+# Snapshot format of the json / journal engines: "compact", "binary" or
+# "json" (indented). Any format is detected on load.
+DB_SNAPSHOT_CODEC = os.getenv("DB_SNAPSHOT_CODEC", "compact")
+
+# Striped per-user locks (same user → serialized, different users → parallel)
+DB_LOCK_STRIPES = int(os.getenv("DB_LOCK_STRIPES", "64"))
+
+# Write-back user cache (0 disables caching → write-through)
+DB_CACHE_SIZE = int(os.getenv("DB_CACHE_SIZE", "5000"))
+DB_FLUSH_INTERVAL_MS = int(os.getenv("DB_FLUSH_INTERVAL_MS", "500"))
+
+logger = logging.getLogger(__name__)
 
 
 # -------------------------------
@@ -12,106 +44,632 @@ DB_PATH = os.path.join(STORAGE_DIR, "database.json")
 # -------------------------------
 os.makedirs(STORAGE_DIR, exist_ok=True)
 
-# If JSON database does not exist → create empty
-if not os.path.exists(DB_PATH):
-    with open(DB_PATH, "w") as f:
-        json.dump({}, f, indent=4)
+
+# -------------------------------
+# OPEN STORAGE ENGINE
+# -------------------------------
+def _open_backend():
+    if DB_BACKEND == "sqlite":
+        engine = create_backend("sqlite", SQLITE_PATH)
+
+        # One-shot import of the legacy JSON file while the table is empty.
+        # put_many is a single transaction, so an interrupted import leaves
+        # no rows and is simply retried on the next boot.
+        if engine.is_empty() and os.path.exists(DB_PATH):
+            import_json_file(DB_PATH, engine)
+
+        return engine
+
+    if DB_BACKEND == "journal":
+        return create_backend("journal", DB_PATH, compact_bytes=JOURNAL_COMPACT_BYTES, codec=DB_SNAPSHOT_CODEC)
+
+    if DB_BACKEND == "json":
+        return create_backend("json", DB_PATH, codec=DB_SNAPSHOT_CODEC)
+
+    return create_backend(DB_BACKEND, DB_PATH)
+
+
+# -------------------------------
+# TYPED USER RECORDS
+# -------------------------------
+class TypedRecords:
+    """
+    Engine wrapper: user records are UserRecord objects in memory and
+    default-elided dicts in storage. Other (meta) records pass through.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    @staticmethod
+    def encode(key, value):
+        if not is_user_key(key) or not isinstance(value, Mapping):
+            return value
+        if not isinstance(value, UserRecord):
+            value = UserRecord.from_storage(value)
+        return value.to_storage()
+
+    @staticmethod
+    def decode(key, value):
+        if is_user_key(key) and isinstance(value, dict):
+            return UserRecord.from_storage(value)
+        return value
+
+    def get(self, key):
+        return self.decode(key, self.engine.get(key))
+
+    def put(self, key, value):
+        self.engine.put(key, self.encode(key, value))
+
+    def put_many(self, items):
+        self.engine.put_many({key: self.encode(key, value) for key, value in items.items()})
+
+    def load_all(self):
+        return {key: self.decode(key, value) for key, value in self.engine.load_all().items()}
+
+    def save_all(self, db):
+        self.engine.save_all({key: self.encode(key, value) for key, value in db.items()})
+
+    def __getattr__(self, name):
+        # keys(), delete(), close(), compact()… go straight to the engine
+        return getattr(self.engine, name)
+
+
+backend = TypedRecords(_open_backend())
+
+# Activity feeds live in their own ring-buffer store (see activity_store.py)
+activity_log = ActivityStore(ACTIVITY_PATH)
+
+
+# -------------------------------
+# WRITE-BACK USER CACHE
+# -------------------------------
+class UserCache:
+    """
+    In-process LRU of user records with dirty tracking.
+
+    Reads of hot users never touch storage. Writes only mark the record
+    dirty; the background flusher (or flush()) batches them to the engine.
+    """
+
+    def __init__(self, engine, max_size):
+        self.engine = engine
+        self.max_size = max_size
+        self._records = OrderedDict()   # uid → record (LRU order)
+        self._dirty = {}                 # uid → write version
+        self._version = 0
+        self._loading = {}               # uid → [drop generation, readers] while read from storage
+        self._flushing = ()              # uids of the batch being written
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+
+    def get(self, uid, keep=True):
+        """
+        Cached record, else the stored one. keep=False (bulk jobs) reads
+        a cold record without caching it, so the hot set is not evicted.
+        """
+        while True:
+            with self._lock:
+                user = self._records.get(uid)
+                if user is not None:
+                    if keep:
+                        self._records.move_to_end(uid)
+                    return user
+                if not keep:
+                    break
+                load = self._loading.setdefault(uid, [0, 0])
+                load[1] += 1
+                generation = load[0]
+
+            user = self.engine.get(uid)
+
+            with self._lock:
+                load[1] -= 1
+                if not load[1]:
+                    del self._loading[uid]
+
+                # Another thread may have cached a newer copy meanwhile
+                cached = self._records.get(uid)
+                if cached is not None:
+                    self._records.move_to_end(uid)
+                    return cached
+
+                # A newer copy was dropped while we read → ours may be stale
+                if load[0] != generation:
+                    continue
+
+                if user is not None:
+                    self._records[uid] = user
+                    self._evict()
+                return user
+
+        return self.engine.get(uid)
+
+    def put(self, uid, user, keep=True):
+        """
+        Cache the record and mark it dirty. keep=False writes a record
+        that is not cached straight to storage instead. The caller holds
+        the user's lock.
+        """
+        with self._lock:
+            if keep or uid in self._records:
+                self._records[uid] = user
+                self._records.move_to_end(uid)
+                self._version += 1
+                self._dirty[uid] = self._version
+                self._evict()
+                return
+
+        self.engine.put(uid, user)
+        with self._lock:
+            # A reader may have cached the old stored copy meanwhile
+            if uid not in self._dirty:
+                self._drop(uid)
+
+    def _drop(self, uid):
+        """Forget a cached record; readers still loading it re-read storage."""
+        self._records.pop(uid, None)
+        load = self._loading.get(uid)
+        if load is not None:
+            load[0] += 1
+
+    def _evict(self):
+        while len(self._records) > self.max_size:
+            uid = next(iter(self._records))
+            if uid in self._flushing:
+                # Written right now: a write-through here could land before
+                # the batch's older copy. Evicted after the flush instead.
+                break
+            user = self._records[uid]
+            self._drop(uid)
+            if self._dirty.pop(uid, None) is not None:
+                # Never drop unsaved data: write the evicted record through
+                self.engine.put(uid, user)
+
+    def flush(self):
+        """Write every dirty record to storage in one batch. Returns count."""
+        # One flush at a time: an older batch must never land after a newer one
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return 0
+                pending = dict(self._dirty)
+                batch = {uid: self._records[uid] for uid in pending}
+                self._flushing = pending
+
+            try:
+                self.engine.put_many(batch)
+            finally:
+                with self._lock:
+                    self._flushing = ()
+
+            with self._lock:
+                for uid, version in pending.items():
+                    # Only clear if not re-dirtied while we were writing
+                    if self._dirty.get(uid) == version:
+                        del self._dirty[uid]
+                self._evict()
+
+            return len(batch)
+
+    def clear(self):
+        """Drop every cached record (dirty ones are flushed first)."""
+        self.flush()
+        with self._lock:
+            for uid in list(self._records):
+                self._drop(uid)
+
+    def peek(self, uid):
+        """Cached record or None: never reads storage, keeps LRU order."""
+        with self._lock:
+            return self._records.get(uid)
+
+    def dirty_count(self):
+        with self._lock:
+            return len(self._dirty)
+
+
+class _WriteThroughCache:
+    """Stand-in used when DB_CACHE_SIZE=0: every call hits the engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def get(self, uid, keep=True):
+        return self.engine.get(uid)
+
+    def put(self, uid, user, keep=True):
+        self.engine.put(uid, user)
+
+    def flush(self):
+        return 0
+
+    def clear(self):
+        pass
+
+    def peek(self, uid):
+        return None
+
+    def dirty_count(self):
+        return 0
+
+
+if DB_CACHE_SIZE > 0:
+    cache = UserCache(backend, DB_CACHE_SIZE)
+else:
+    cache = _WriteThroughCache(backend)
+
+
+# -------------------------------
+# BACKGROUND FLUSHER
+# -------------------------------
+_flush_stop = threading.Event()
+
+
+def flush():
+    """Persist all dirty cached users now (admin tools, shutdown)."""
+    return cache.flush()
+
+
+def _flush_loop():
+    while not _flush_stop.wait(DB_FLUSH_INTERVAL_MS / 1000):
+        try:
+            cache.flush()
+        except Exception as e:
+            logger.error(f"Cache flush failed: {e}")
+
+
+def shutdown():
+    """Stop the flusher and write out everything still pending."""
+    _flush_stop.set()
+    flush()
+    backend.close()
+    activity_log.close()
+
+
+if DB_CACHE_SIZE > 0:
+    threading.Thread(target=_flush_loop, name="db-flusher", daemon=True).start()
+
+atexit.register(shutdown)
+
+
+# -------------------------------
+# META RECORDS (job state, cursors)
+# -------------------------------
+def is_user_key(key):
+    """User records are keyed by Telegram id; anything else is metadata."""
+    return str(key).lstrip("-").isdigit()
+
+
+def get_meta(key, default=None):
+    """Read a non-user record straight from storage (never cached)."""
+    value = backend.get(key)
+    return default if value is None else value
+
+
+def put_meta(key, value):
+    """Write a non-user record straight to storage (durable on return)."""
+    backend.put(key, value)
+
+
+def user_ids():
+    """Every stored user id, sorted (pending cache writes included)."""
+    flush()
+    return sorted((k for k in backend.keys() if is_user_key(k)), key=int)
+
+
+# -------------------------------
+# WRITE HOOKS
+# -------------------------------
+_write_hooks = []
+
+
+def add_write_hook(fn):
+    """
+    Call fn(uid, user) after every committed user write.
+    Runs under the user's lock, so hooks see one user's writes in order.
+    Used by in-memory indexes (leaderboards) to stay current.
+    """
+    _write_hooks.append(fn)
+
+
+def _notify_write(uid, user):
+    for hook in _write_hooks:
+        try:
+            hook(uid, user)
+        except Exception as e:
+            logger.error(f"Write hook failed: {e}")
+
+
+# -------------------------------
+# STREAM USERS (bulk jobs)
+# -------------------------------
+def iter_users(fields=None):
+    """
+    Yield (uid, user) for every stored user, one record at a time, so a
+    bulk job runs in constant memory whatever the user count.
+
+    fields=("weekly", "badges") → each user is a small dict with only
+    those fields (defaults filled in); None → the full UserRecord.
+    Pending cache writes are flushed first; writes made while iterating
+    may or may not be seen.
+    """
+    flush()
+    for key, value in backend.engine.iter_records():
+        if not is_user_key(key) or not isinstance(value, dict):
+            continue
+        if fields is None:
+            yield key, UserRecord.from_storage(value)
+            continue
+
+        record = UserRecord.from_storage({f: value[f] for f in fields if f in value})
+        yield key, {f: record.get(f) for f in fields}
 
 
 # -------------------------------
 # LOAD DATABASE
 # -------------------------------
 def load_db():
-    """Load and return entire JSON database."""
-    try:
-        with open(DB_PATH, "r") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+    """
+    Load and return entire database (all users) at once.
+    Prefer get_user(), or iter_users() for jobs that scan everyone.
+    """
+    flush()
+    return backend.load_all()
 
 
 # -------------------------------
 # SAVE DATABASE
 # -------------------------------
 def save_db(db: dict):
-    """Safely write the database to disk."""
-    # Write to temporary file first (prevents corruption)
-    temp_path = DB_PATH + ".tmp"
+    """Write the entire database back to storage. Prefer save_user()."""
+    flush()
+    backend.save_all(db)
+    cache.clear()
+
+    for uid, user in db.items():
+        if is_user_key(uid) and isinstance(user, Mapping):
+            _notify_write(uid, user)
+
+
+# -------------------------------
+# NEW USER TEMPLATE
+# -------------------------------
+def new_user_record():
+    """Return a fresh user record (defaults live in user_record.DEFAULTS)."""
+    user = UserRecord()
+    user["created_at"] = int(time.time())
+    return user
+
+
+# -------------------------------
+# PER-USER LOCKS
+# -------------------------------
+_user_locks = [threading.RLock() for _ in range(DB_LOCK_STRIPES)]
+
+
+def user_lock(user_id: int):
+    """
+    Re-entrant lock guarding one user's record.
+    Users are spread over DB_LOCK_STRIPES locks, so memory stays fixed
+    while updates for different users still run in parallel.
+    """
+    return _user_locks[hash(str(user_id)) % DB_LOCK_STRIPES]
+
+
+# -------------------------------
+# USER TRANSACTIONS (unit of work)
+# -------------------------------
+_txn_local = threading.local()
+
+
+def _open_txns():
+    """Per-thread map of uid → record for transactions still open."""
+    txns = getattr(_txn_local, "users", None)
+    if txns is None:
+        txns = _txn_local.users = {}
+    return txns
+
+
+def _commit_actions():
+    """Per-thread map of uid → callbacks waiting for that transaction's commit."""
+    actions = getattr(_txn_local, "after", None)
+    if actions is None:
+        actions = _txn_local.after = {}
+    return actions
+
+
+@contextmanager
+def user_txn(user_id: int, cached: bool = True):
+    """
+    Unit of work for one user: one read on entry, one write on exit.
+
+    Usage:
+        with user_txn(user_id) as user:
+            user["xp"] += 50
+
+    Any get_user / save_user / log_activity / nested user_txn call for the
+    same user inside the block joins this transaction instead of touching
+    storage. Changes are discarded if the block raises.
+
+    The commit goes to the write-back cache; the flusher persists it
+    within DB_FLUSH_INTERVAL_MS (or at shutdown / flush()).
 
-    with open(temp_path, "w") as f:
-        json.dump(db, f, indent=4)
+    The user's lock is held for the whole block, so concurrent
+    transactions for the same user never overwrite each other.
+    Do not open a transaction for another user inside the block.
 
-    # Replace the old file atomically
-    os.replace(temp_path, DB_PATH)
+    cached=False is for bulk jobs: a user who is not in the cache is
+    read from and written to storage directly, so a pass over every
+    user does not push hot users out of the cache.
+    """
+    uid = str(user_id)
+    txns = _open_txns()
+
+    # Nested → join the outer transaction
+    if uid in txns:
+        yield txns[uid]
+        return
+
+    with user_lock(user_id):
+        original = cache.get(uid, keep=cached)
+        created = original is None
+
+        # Work on a private copy so a failed block leaves the cache untouched
+        user = new_user_record() if created else copy.deepcopy(original)
+        txns[uid] = user
+
+        try:
+            yield user
+        finally:
+            del txns[uid]
+            pending = _commit_actions().pop(uid, ())
+
+        # Single write (skipped if nothing changed)
+        if created or user != original:
+            cache.put(uid, user, keep=cached)
+            _notify_write(uid, user)
+
+    for fn in pending:
+        try:
+            fn()
+        except Exception as e:
+            logger.error(f"After-commit action failed: {e}")
+
+
+def after_commit(user_id: int, fn):
+    """
+    Run fn() once the user's open transaction has committed (after the
+    lock is released). Dropped if the transaction fails; runs right away
+    when no transaction is open.
+    """
+    uid = str(user_id)
+    if uid not in _open_txns():
+        fn()
+        return
+    _commit_actions().setdefault(uid, []).append(fn)
 
 
 # -------------------------------
 # INIT USER IF MISSING
 # -------------------------------
 def init_user(user_id: int):
-    """Create a new user entry if they don't exist yet."""
+    """Create a new user entry if they don't exist yet. Returns a copy."""
+    with user_txn(user_id) as user:
+        pass
+    return copy.deepcopy(user)
+
+
+# -------------------------------
+# SAVE ONE USER
+# -------------------------------
+def save_user(user_id: int, user: dict):
+    """
+    Write a single user record back to storage.
+    Inside user_txn() the record is only staged; the transaction writes it.
+    """
     uid = str(user_id)
-    db = load_db()
-
-    if uid not in db:
-        db[uid] = {
-            "xp": 0,
-            "rank": "Bronze",
-            "streak": 0,
-            "grinds_today": 0,
-            "last_grind": 0,
-            "last_grind_date": None,
-            "badges": [],
-            "onboarding_step": 1,
-            "onboarding_complete": False,
-            "settings": {
-                "notifications": True,
-                "theme": "Dark",
-                "language": "English"
-            },
-            "activity": [],
-            "weekly": {
-                "xp": 0,
-                "grinds": 0,
-                "badges": 0
-            },
-            "created_at": int(time.time())
-        }
-        save_db(db)
-
-    return load_db()[uid]
+    txns = _open_txns()
+
+    if uid in txns:
+        staged = txns[uid]
+        if staged is not user:
+            staged.clear()
+            staged.update(user)
+        return
+
+    if not isinstance(user, UserRecord):
+        user = UserRecord.from_storage(user)
+
+    with user_lock(user_id):
+        cache.put(uid, user)
+        _notify_write(uid, user)
 
 
 # -------------------------------
 # ACTIVITY LOGGING
 # -------------------------------
-def log_activity(user_id: int, text: str):
-    """Add an entry to user's activity log."""
-    db = load_db()
-    uid = str(user_id)
+def log_activity(user_id: int, text: str, kind: str = "other"):
+    """
+    Add an entry to the user's activity feed. `kind` is one of
+    activity_store.KINDS (grind, game, badge, rank, settings, other).
+    Inside user_txn() it is written once the transaction commits.
+    """
+    _move_legacy_activity(user_id)
+    when = int(time.time())
+    after_commit(user_id, lambda: activity_log.append(int(user_id), text, kind, when))
+
+
+def get_activity_page(user_id: int, per_page: int, before=None, after=None, kind=None):
+    """
+    One page of the user's feed, newest first:
+    (entries, older_cursor, newer_cursor). See ActivityStore.page().
+    """
+    _move_legacy_activity(user_id)
+    return activity_log.page(int(user_id), per_page, before=before, after=after, kind=kind)
 
-    if uid not in db:
-        init_user(user_id)
-        db = load_db()
 
-    log_list = db[uid].setdefault("activity", [])
-    log_list.insert(0, {
-        "time": int(time.time()),
-        "text": text
-    })
+def clear_activity(user_id: int):
+    """Erase the user's activity feed (account reset)."""
+    activity_log.clear(int(user_id))
 
-    # Limit to last 500 entries
-    db[uid]["activity"] = log_list[:500]
 
-    save_db(db)
+def _move_legacy_activity(user_id):
+    # Older records kept the feed in user["activity"] (newest first).
+    # Never creates a record: a log from a deferred lane for a user with
+    # no record must not bring one into existence.
+    user = peek_user(user_id)
+    if user is not None and "activity" not in user:
+        return
+
+    with user_lock(user_id):
+        if user is None:
+            # Not in memory → check the stored record under the lock
+            stored = cache.get(str(user_id))
+            if stored is None or "activity" not in stored:
+                return
+        with user_txn(user_id) as user:
+            legacy = user.pop("activity", None)
+            if legacy:
+                entries = [(item["time"], item["text"], "other") for item in reversed(legacy)]
+                after_commit(user_id, lambda: activity_log.append_many(int(user_id), entries))
+
+
+# -------------------------------
+# PEEK USER (no storage access)
+# -------------------------------
+def peek_user(user_id: int):
+    """
+    Return the user's record only if it is already in memory, else None.
+    For static screens that just want the theme: never reads storage
+    and never creates a record. Like get_user(), a copy outside user_txn.
+    """
+    uid = str(user_id)
+    txns = _open_txns()
+    if uid in txns:
+        return txns[uid]
+
+    user = cache.peek(uid)
+    return None if user is None else copy.deepcopy(user)
 
 
 # -------------------------------
 # GET USER OBJECT
 # -------------------------------
 def get_user(user_id: int):
-    db = load_db()
+    """
+    The user's record (created if missing).
+
+    Inside user_txn() this is the transaction's record. Outside, it is a
+    private copy: the cached record is shared between threads, so all
+    writes go through user_txn() (changes to the copy are never saved).
+    """
     uid = str(user_id)
-    if uid not in db:
+    txns = _open_txns()
+    if uid in txns:
+        return txns[uid]
+
+    user = cache.get(uid)
+    if user is None:
         return init_user(user_id)
-    return db[uid]
+    return copy.deepcopy(user)
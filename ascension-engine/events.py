@@ -0,0 +1,125 @@
+"""
+events.py
+In-process event bus for game bookkeeping.
+
+Core code (XP ledger, grinding, badges, weekly reset) emits an event
+instead of calling every interested module itself:
+
+    events.emit(GrindPerformed(user_id, GRIND_XP, grinds_today, grinds_week))
+
+Subscribers choose how they run:
+- inline=True   → called right away on the emitting thread. Inside the
+                  emitter's user_txn they join it (same single write).
+                  For state the response depends on (challenges, badges).
+- inline=False  → deferred: queued once the emitter's transaction has
+                  committed and run on a small worker pool, off the
+                  request's critical path (activity log, notifications).
+
+Deferred events of one user run in emit order (one lane per user stripe).
+"""
+
+import os
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from database import after_commit
+
+logger = logging.getLogger(__name__)
+
+EVENT_WORKERS = int(os.getenv("EVENT_WORKERS", "4"))
+
+
+# ---------------------------------------------------------
+# EVENT TYPES
+# ---------------------------------------------------------
+XpAwarded = namedtuple("XpAwarded", ["user_id", "delta", "xp", "old_rank", "rank", "source"])
+GrindPerformed = namedtuple("GrindPerformed", ["user_id", "xp", "grinds_today", "grinds_week"])
+BadgeUnlocked = namedtuple("BadgeUnlocked", ["user_id", "badge"])
+WeeklyReset = namedtuple("WeeklyReset", ["week", "dominators"])
+
+
+# ---------------------------------------------------------
+# EVENT BUS
+# ---------------------------------------------------------
+class EventBus:
+    def __init__(self, workers=EVENT_WORKERS):
+        self._inline = {}                    # event type → [fn]
+        self._deferred = {}                  # event type → [fn]
+        # One single-thread lane per stripe → per-user order is kept
+        self._lanes = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"events-{i}")
+            for i in range(workers)
+        ]
+        self._lock = threading.Lock()
+        self._running = True
+
+        # Metrics
+        self.emitted = 0
+        self.deferred = 0
+        self.failed = 0
+
+    def subscribe(self, event_type, fn, inline=False):
+        """Call fn(event) for every emitted event of `event_type`."""
+        target = self._inline if inline else self._deferred
+        target.setdefault(event_type, []).append(fn)
+
+    def emit(self, event):
+        """Run inline subscribers now; queue deferred ones after commit."""
+        with self._lock:
+            self.emitted += 1
+
+        for fn in self._inline.get(type(event), ()):
+            self._call(fn, event)
+
+        deferred = self._deferred.get(type(event))
+        if deferred:
+            user_id = getattr(event, "user_id", None)
+            if user_id is None:
+                self._queue(None, deferred, event)
+            else:
+                after_commit(user_id, lambda: self._queue(user_id, deferred, event))
+
+    def _queue(self, user_id, subscribers, event):
+        if not self._running:
+            return
+        with self._lock:
+            self.deferred += 1
+        lane = self._lanes[hash(str(user_id)) % len(self._lanes)]
+        for fn in subscribers:
+            try:
+                lane.submit(self._call, fn, event)
+            except RuntimeError:
+                # Interpreter exiting: lanes take no new work → run it here
+                self._call(fn, event)
+
+    def _call(self, fn, event):
+        try:
+            fn(event)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error(f"Event subscriber {fn.__name__} failed on {type(event).__name__}: {e}")
+
+    # ---------------------------------------------------------
+    # SHUTDOWN + METRICS
+    # ---------------------------------------------------------
+    def stop(self):
+        """Stop taking deferred work and finish what is already queued."""
+        self._running = False
+        for lane in self._lanes:
+            lane.shutdown(wait=True)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "emitted": self.emitted,
+                "deferred": self.deferred,
+                "failed": self.failed,
+            }
+
+
+bus = EventBus()
+subscribe = bus.subscribe
+emit = bus.emit
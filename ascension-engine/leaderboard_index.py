@@ -0,0 +1,259 @@
+"""
+leaderboard_index.py
+In-memory leaderboard index kept up to date on every user write.
+
+One sorted collection of (-score, uid) per metric:
+- "xp"      → weekly XP
+- "grinds"  → weekly grinds
+- "badges"  → badge count
+
+The collection is a list of sorted blocks (_SortedBlocks), so a write
+moves one entry inside one block (O(log n + block size)) instead of
+shifting a flat list of every user (insort is O(n)). Top-K reads walk
+the first blocks and a user's rank is a bisect plus a block offset.
+The index is built from storage once at startup (or on the first read)
+and then follows database write hooks; it is never saved.
+"""
+
+import bisect
+import threading
+from collections.abc import Mapping
+
+import database
+
+
+def _weekly(user, field):
+    weekly = user.get("weekly")
+    return weekly.get(field, 0) if isinstance(weekly, dict) else 0
+
+
+METRICS = {
+    "xp": lambda user: _weekly(user, "xp"),
+    "grinds": lambda user: _weekly(user, "grinds"),
+    "badges": lambda user: len(user.get("badges", [])),
+}
+
+# Record fields the metrics read (all a rebuild has to load)
+METRIC_FIELDS = ("weekly", "badges")
+
+
+_BLOCK = 512  # blocks split at 2 * _BLOCK entries
+
+
+class _SortedBlocks:
+    """
+    Sorted list kept as blocks of at most 2 * _BLOCK items.
+    _maxes[i] is the last item of block i (bisect picks the block);
+    _tree is a Fenwick tree over block lengths, so the position of an
+    item and the item at a position are both O(log n) to find.
+    """
+
+    def __init__(self, items=()):
+        items = sorted(items)
+        self._blocks = [items[i:i + _BLOCK] for i in range(0, len(items), _BLOCK)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._len = len(items)
+        self._build_tree()
+
+    def __len__(self):
+        return self._len
+
+    # Fenwick tree over block lengths (rebuilt when blocks split or go)
+    def _build_tree(self):
+        n = len(self._blocks)
+        tree = [0] * (n + 1)
+        for i, block in enumerate(self._blocks, 1):
+            tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, i, delta):
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _offset(self, i):
+        """Number of items in blocks[:i]."""
+        total = 0
+        while i:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _find(self, pos):
+        """(block, offset) of the item at position `pos` (< len)."""
+        i = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = i + step
+            if nxt < len(self._tree) and self._tree[nxt] <= pos:
+                i = nxt
+                pos -= self._tree[nxt]
+            step >>= 1
+        return i, pos
+
+    def add(self, item):
+        if not self._blocks:
+            self._blocks, self._maxes, self._len = [[item]], [item], 1
+            self._build_tree()
+            return
+
+        i = min(bisect.bisect_left(self._maxes, item), len(self._blocks) - 1)
+        block = self._blocks[i]
+        bisect.insort(block, item)
+        self._maxes[i] = block[-1]
+        self._len += 1
+
+        if len(block) > 2 * _BLOCK:
+            self._blocks[i:i + 1] = [block[:_BLOCK], block[_BLOCK:]]
+            self._maxes[i:i + 1] = [block[_BLOCK - 1], block[-1]]
+            self._build_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, item):
+        """Remove `item`, which must be present."""
+        i = bisect.bisect_left(self._maxes, item)
+        block = self._blocks[i]
+        del block[bisect.bisect_left(block, item)]
+        self._len -= 1
+
+        if block:
+            self._maxes[i] = block[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._blocks[i], self._maxes[i]
+            self._build_tree()
+
+    def index(self, item):
+        """Position `item` has (or would be inserted at)."""
+        i = bisect.bisect_left(self._maxes, item)
+        if i == len(self._blocks):
+            return self._len
+        return self._offset(i) + bisect.bisect_left(self._blocks[i], item)
+
+    def slice(self, start, stop):
+        """Items at positions start..stop-1, as a list."""
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        i, offset = self._find(start)
+        out = []
+        while len(out) < stop - start:
+            out.extend(self._blocks[i][offset:offset + stop - start - len(out)])
+            i, offset = i + 1, 0
+        return out
+
+
+class LeaderboardIndex:
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self._sorted = {name: _SortedBlocks() for name in metrics}  # name → (-score, uid)
+        self._scores = {name: {} for name in metrics}   # name → uid → score
+        self._lock = threading.RLock()
+        self._built = False
+
+    # ---------------------------------------------------------
+    # BUILD
+    # ---------------------------------------------------------
+    def rebuild(self, records=None):
+        """
+        Rebuild every metric from `records` (uid → user) or from storage.
+        Storage is streamed (only METRIC_FIELDS), never loaded whole.
+        """
+        with self._lock:
+            if records is None:
+                pairs = database.iter_users(fields=METRIC_FIELDS)
+            else:
+                pairs = records.items()
+
+            scores = {name: {} for name in self.metrics}
+            for uid, user in pairs:
+                if database.is_user_key(uid) and isinstance(user, Mapping):
+                    for name, score_of in self.metrics.items():
+                        scores[name][uid] = score_of(user)
+
+            for name, by_uid in scores.items():
+                self._scores[name] = by_uid
+                self._sorted[name] = _SortedBlocks((-score, uid) for uid, score in by_uid.items())
+
+            self._built = True
+
+    def ensure_built(self):
+        if not self._built:
+            self.rebuild()
+
+    # ---------------------------------------------------------
+    # INCREMENTAL UPDATES (database write hook)
+    # ---------------------------------------------------------
+    def update(self, uid, user):
+        """Re-score one user; only metrics whose value changed are touched."""
+        with self._lock:
+            # Not built yet → the first rebuild reads this write from storage
+            if not self._built:
+                return
+
+            for name, score_of in self.metrics.items():
+                score = score_of(user)
+                scores = self._scores[name]
+                old = scores.get(uid)
+                if old == score:
+                    continue
+
+                entries = self._sorted[name]
+                if old is not None:
+                    entries.remove((-old, uid))
+                entries.add((-score, uid))
+                scores[uid] = score
+
+    # ---------------------------------------------------------
+    # READS
+    # ---------------------------------------------------------
+    def top(self, name, k=3):
+        """Top `k` as [(uid, score)], best first."""
+        self.ensure_built()
+        with self._lock:
+            return [(uid, -neg) for neg, uid in self._sorted[name].slice(0, k)]
+
+    def rank(self, name, uid):
+        """1-based position of `uid` for a metric, or None if not ranked."""
+        self.ensure_built()
+        uid = str(uid)
+        with self._lock:
+            score = self._scores[name].get(uid)
+            if score is None:
+                return None
+            return self._sorted[name].index((-score, uid)) + 1
+
+    def around(self, name, uid, span=1):
+        """
+        The user's row plus `span` rows above and below,
+        as [(rank, uid, score)]. Empty if the user is not ranked.
+        """
+        self.ensure_built()
+        uid = str(uid)
+        with self._lock:
+            score = self._scores[name].get(uid)
+            if score is None:
+                return []
+            entries = self._sorted[name]
+            pos = entries.index((-score, uid))
+            lo = max(0, pos - span)
+            return [(lo + n + 1, u, -neg) for n, (neg, u) in enumerate(entries.slice(lo, pos + span + 1))]
+
+    def score(self, name, uid):
+        self.ensure_built()
+        with self._lock:
+            return self._scores[name].get(str(uid))
+
+    def size(self, name):
+        self.ensure_built()
+        with self._lock:
+            return len(self._sorted[name])
+
+
+index = LeaderboardIndex(METRICS)
+database.add_write_hook(index.update)
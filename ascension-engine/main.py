@@ -5,14 +5,36 @@ Entry point for the entire Telegram bot.
 """
 
 import os
+import sys
+import atexit
+import signal
 import logging
-from flask import Flask, request
+import threading
+from collections import OrderedDict
+from flask import Flask, request, jsonify
 
 from telegram import Bot, Update
 
 # ROUTER
 from router import handle_update
 
+# UPDATE WORKERS
+from worker_pool import WorkerPool
+from scheduler import scheduler
+
+# OUTBOUND (rate-limited send queue)
+from outbound import OutboundBot
+
+# GAME SESSIONS
+from sessions import sessions
+
+# EVENT BUS (deferred bookkeeping)
+from events import bus as event_bus
+
+# IN-MEMORY INDEXES + BACKGROUND JOBS
+from leaderboard_index import index as leaderboard_index
+from modules.leaderboard import start_reset_scheduler
+
 # Logging
 logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -26,12 +48,74 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 if not TELEGRAM_TOKEN:
     raise Exception("TELEGRAM_TOKEN environment variable not set!")
 
-bot = Bot(token=TELEGRAM_TOKEN)
+# Handlers get the queued, rate-limited wrapper instead of the raw Bot
+bot = OutboundBot(Bot(token=TELEGRAM_TOKEN))
+
+# Optional: Telegram sends this back in X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+
+# Worker pool sizing
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "8"))
+UPDATE_QUEUE_SIZE = int(os.getenv("UPDATE_QUEUE_SIZE", "256"))
 
 # Flask app
 app = Flask(__name__)
 
 
+# ---------------------------------------------------------
+# UPDATE PROCESSING (runs on the worker pool)
+# ---------------------------------------------------------
+def process_update(json_update):
+    update = Update.de_json(json_update, bot)
+
+    logger.info(f"Incoming update: {json_update}")
+
+    # Forward to unified router
+    handle_update(bot, update)
+
+
+# Build the leaderboard index from storage before taking traffic
+leaderboard_index.rebuild()
+
+# Weekly leaderboard reset (resumes an interrupted run on boot)
+start_reset_scheduler()
+
+pool = WorkerPool(process_update, workers=UPDATE_WORKERS, queue_size=UPDATE_QUEUE_SIZE)
+
+
+def _sender_id(json_update):
+    """User id the update belongs to (keeps per-user ordering)."""
+    for kind in ("callback_query", "message", "edited_message", "inline_query"):
+        payload = json_update.get(kind)
+        if payload and "from" in payload:
+            return payload["from"].get("id")
+    return json_update["update_id"]
+
+
+# ---------------------------------------------------------
+# DUPLICATE DELIVERY GUARD
+# ---------------------------------------------------------
+_recent_updates = OrderedDict()
+_recent_lock = threading.Lock()
+RECENT_UPDATES_MAX = 2048
+
+
+def _claim(update_id):
+    """Mark an update as taken; False if it was already queued."""
+    with _recent_lock:
+        if update_id in _recent_updates:
+            return False
+        _recent_updates[update_id] = True
+        if len(_recent_updates) > RECENT_UPDATES_MAX:
+            _recent_updates.popitem(last=False)
+        return True
+
+
+def _release(update_id):
+    with _recent_lock:
+        _recent_updates.pop(update_id, None)
+
+
 @app.route("/")
 def home():
     """Landing page — required for uptime pings."""
@@ -40,22 +124,84 @@ def home():
 
 @app.route("/webhook", methods=["POST"])
 def webhook():
-    """Main webhook entry point."""
-    try:
-        json_update = request.get_json(force=True)
-        update = Update.de_json(json_update, bot)
+    """
+    Main webhook entry point.
+    Validates and queues the update, then answers immediately;
+    the worker pool does the actual handling.
+    """
+    if WEBHOOK_SECRET and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+        return "forbidden", 403
+
+    json_update = request.get_json(force=True, silent=True)
+    if not isinstance(json_update, dict) or "update_id" not in json_update:
+        logger.error("Webhook error: malformed update")
+        return "bad request", 400
+
+    update_id = json_update["update_id"]
+
+    # Telegram re-delivers on timeouts → ignore repeats
+    if not _claim(update_id):
+        return "ok"
+
+    # Queue full / shutting down → let Telegram retry later
+    if not pool.submit(_sender_id(json_update), json_update):
+        _release(update_id)
+        return "busy", 503
+
+    return "ok"
 
-        logger.info(f"Incoming update: {json_update}")
 
-        # Forward to unified router
-        handle_update(bot, update)
+@app.route("/metrics")
+def metrics():
+    """Worker pool backpressure, timers, outbound queue, sessions and events."""
+    return jsonify({
+        **pool.metrics(),
+        "timers": scheduler.metrics(),
+        "outbound": bot.metrics(),
+        "sessions": sessions.metrics(),
+        "events": event_bus.metrics(),
+    })
 
-    except Exception as e:
-        logger.error(f"Webhook error: {e}")
 
-    return "ok"
+# ---------------------------------------------------------
+# GRACEFUL SHUTDOWN
+# ---------------------------------------------------------
+_shutdown_lock = threading.Lock()
+_shut_down = False
+
+
+def shutdown():
+    """Stop accepting updates and finish everything already queued."""
+    global _shut_down
+    with _shutdown_lock:
+        if _shut_down:
+            return
+        _shut_down = True
+
+    logger.info("Draining update queue...")
+    pool.stop()
+    scheduler.stop()
+    event_bus.stop()
+    bot.stop()
+
+
+def _on_sigterm(*_):
+    # Drain first, then exit normally (database.shutdown() flushes from atexit)
+    shutdown()
+    sys.exit(0)
+
+
+signal.signal(signal.SIGTERM, _on_sigterm)
+
+# Any other exit (e.g. under a WSGI server). Registered after database's
+# hook, so it runs before the flush (atexit is LIFO). Thread pools may
+# already refuse work by then; queued work is then run inline.
+atexit.register(shutdown)
 
 
 if __name__ == "__main__":
-    # Replit requires host=0.0.0.0
-    app.run(host="0.0.0.0", port=8080)
+    try:
+        # Replit requires host=0.0.0.0
+        app.run(host="0.0.0.0", port=8080)
+    finally:
+        shutdown()
@@ -3,77 +3,141 @@ modules/activity.py
 Scrollable activity log for PWN Ascension Engine.
 
 Supports:
-- Paginated activity feed
-- Recent actions
+- Cursor-paginated activity feed (act_<filter>_<cursor>)
+- Filters: all / only badges / only games
+- Recent actions with timestamps
 - Navigation
 """
 
+from datetime import datetime
+
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import get_user, load_db
+from database import get_user, log_activity, get_activity_page
+from events import subscribe, GrindPerformed, BadgeUnlocked, XpAwarded
 from ui.components import render_text
+from registry import register_callback
 
 
 ITEMS_PER_PAGE = 10
 
+# Filter id (in callback_data) → entry kind (None = everything)
+FILTERS = {"all": None, "badge": "badge", "game": "game"}
+
+KIND_ICONS = {"grind": "🔥", "game": "🎮", "badge": "🎖", "rank": "🏅", "settings": "⚙️"}
+
+# XP sources that are not mini-games
+NON_GAME_SOURCES = ("grind", "challenge", "onboarding")
+
+
+# ---------------------------------------------------------
+# EVENT SUBSCRIBERS (deferred: off the request path)
+# ---------------------------------------------------------
+def _log_grind(event):
+    log_activity(event.user_id, f"Performed grind (+{event.xp} XP)", "grind")
+
+
+def _log_badge(event):
+    log_activity(event.user_id, f"Unlocked badge: {event.badge}", "badge")
+
+
+def _log_xp(event):
+    if event.source not in NON_GAME_SOURCES:
+        log_activity(event.user_id, f"Played {event.source}: {event.delta:+} XP", "game")
+    elif event.source == "challenge":
+        log_activity(event.user_id, f"Challenge reward (+{event.delta} XP)")
+
+    if event.rank != event.old_rank:
+        log_activity(event.user_id, f"Rank: {event.old_rank} → {event.rank}", "rank")
+
+
+subscribe(GrindPerformed, _log_grind)
+subscribe(BadgeUnlocked, _log_badge)
+subscribe(XpAwarded, _log_xp)
+
 
 # ---------------------------------------------------------
 # MAIN UI HANDLER
 # ---------------------------------------------------------
+@register_callback("act")
 def handle_activity_callback(bot, update):
     query = update.callback_query
     data = query.data
 
-    # Format: act_{page_num}
-    page = int(data.replace("act_", ""))
+    # Format: act_{filter}_{cursor}   cursor: "" (newest) | o{seq} (older) | n{seq} (newer)
+    # "act_0" (old profile buttons) → newest page, no filter
+    parts = data.split("_")[1:]
+    if parts == ["0"]:
+        parts = ["all"]
 
-    return _show_activity_page(bot, update, page)
+    cursor = parts[1] if len(parts) == 2 else ""
+    valid_cursor = cursor == "" or (cursor[:1] in ("o", "n") and cursor[1:].isdigit())
+    if not parts or len(parts) > 2 or parts[0] not in FILTERS or not valid_cursor:
+        return query.answer()  # malformed / crafted data → nothing to show
+
+    return _show_activity_page(bot, update, parts[0], cursor)
 
 
 # ---------------------------------------------------------
 # INTERNAL: RENDER PAGE
 # ---------------------------------------------------------
-def _show_activity_page(bot, update, page):
+def _show_activity_page(bot, update, flt, cursor):
     query = update.callback_query
     user_id = query.from_user.id
-    user = get_user(user_id)
 
-    db = load_db()
-    uid = str(user_id)
+    text, keyboard = render_activity_page(user_id, flt, cursor)
 
-    logs = db.get(uid, {}).get("activity", [])
+    query.edit_message_text(
+        text=text,
+        parse_mode="Markdown",
+        reply_markup=keyboard
+    )
+
+
+def render_activity_page(user_id, flt="all", cursor=""):
+    """Text + keyboard of one feed page (also used by /activity)."""
+    user = get_user(user_id)
 
-    # Pagination
-    start = page * ITEMS_PER_PAGE
-    end = start + ITEMS_PER_PAGE
-    page_items = logs[start:end]
+    before = after = None
+    if cursor[:1] == "o" and cursor[1:].isdigit():
+        before = int(cursor[1:])
+    elif cursor[:1] == "n" and cursor[1:].isdigit():
+        after = int(cursor[1:])
+
+    # Reads only this page's entries (index range scan)
+    page_items, older, newer = get_activity_page(
+        user_id, ITEMS_PER_PAGE, before=before, after=after, kind=FILTERS[flt]
+    )
 
     text = "📜 *ACTIVITY LOG*\n\n"
     if not page_items:
         text += "_No activities yet._\n"
     else:
         for item in page_items:
-            ts = item["time"]
+            when = datetime.utcfromtimestamp(item["time"]).strftime("%d %b %H:%M")
+            icon = KIND_ICONS.get(item["kind"], "•")
             msg = item["text"]
-            text += f"• `{msg}`\n"
+            text += f"{icon} `{when}` {msg}\n"
 
     text = render_text(user, text)
 
     # Navigation buttons
     nav_buttons = []
 
-    if page > 0:
-        nav_buttons.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"act_{page-1}"))
-    if end < len(logs):
-        nav_buttons.append(InlineKeyboardButton("Next ➡️", callback_data=f"act_{page+1}"))
+    if newer is not None:
+        nav_buttons.append(InlineKeyboardButton("⬅️ Prev", callback_data=f"act_{flt}_n{newer}"))
+    if older is not None:
+        nav_buttons.append(InlineKeyboardButton("Next ➡️", callback_data=f"act_{flt}_o{older}"))
+
+    filter_buttons = [
+        InlineKeyboardButton(("✅ " if flt == key else "") + label, callback_data=f"act_{key}")
+        for key, label in (("all", "All"), ("badge", "🎖 Badges"), ("game", "🎮 Games"))
+    ]
 
     keyboard = InlineKeyboardMarkup([
         nav_buttons,
+        filter_buttons,
         [InlineKeyboardButton("🏠 Menu", callback_data="menu_main")],
         [InlineKeyboardButton("🧿 Profile", callback_data="prof_main")]
     ])
 
-    query.edit_message_text(
-        text=text,
-        parse_mode="Markdown",
-        reply_markup=keyboard
-    )
+    return text, keyboard
@@ -8,11 +8,17 @@ A speed + memory hybrid game:
 • User must recall counts of each emoji
 """
 
-import time
 import random
+import threading
+from collections import namedtuple
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import get_user, load_db, save_db
+from database import get_user, user_txn
+from modules.xp_ledger import award_xp
 from ui.components import render_text
+from registry import register_callback
+from scheduler import scheduler
+from sessions import sessions
+from modules.error_screen import show_error
 
 # Emojis used in sequences
 EMOJIS = ["🔥", "⚡", "💀"]
@@ -25,6 +31,12 @@ XP_FAIL = 0
 # XP penalty for mistakes
 RUSH_PENALTY = 8
 
+# Seconds each emoji stays on screen
+FLASH_INTERVAL = 0.30
+
+# Round state kept server-side (callback_data only carries the token)
+RushRound = namedtuple("RushRound", ["final", "counts"])
+
 
 # ---------------------------------------------
 # 20 PREMADE FLASH SEQUENCES
@@ -59,6 +71,7 @@ FLASH_SEQUENCES = [
 # ---------------------------------------------------------
 # Callback router
 # ---------------------------------------------------------
+@register_callback("game_rush", "rush")
 def handle_ascension_rush_callback(bot, update):
     q = update.callback_query
     data = q.data
@@ -69,9 +82,10 @@ def handle_ascension_rush_callback(bot, update):
     if data == "rush_start":
         return _start_round(bot, update)
 
-    if data.startswith("rush_answer_"):
-        _, answer_type, chosen, correct, counts_raw = data.split("_", 4)
-        return _process_answer(bot, update, answer_type, chosen, correct, counts_raw)
+    # rush_final_<token>_<emoji index> / rush_count_<token>_<emoji index>
+    if data.startswith(("rush_final_", "rush_count_")):
+        _, answer_type, token, index = data.split("_")
+        return _process_answer(bot, update, answer_type, token, int(index))
 
 
 # ---------------------------------------------------------
@@ -115,23 +129,41 @@ def _start_round(bot, update):
     # Pick any sequence in difficulty range
     seq = random.choice(FLASH_SEQUENCES[:max_index])
 
-    # Flash sequence FAST
-    for emo in seq:
-        q.edit_message_text(
-            text=render_text(user, emo),
-            parse_mode="Markdown"
+    # Flash sequence FAST — each frame is a scheduled edit, no thread is held
+    _flash(bot, q, user, seq, 0)
+
+
+def _flash(bot, q, user, seq, pos, shown=None):
+    # Previous frame still in the send queue (rate limit) → check again
+    # later. Queued edits of one message collapse into the newest, so
+    # sending now could drop a frame the player has to count.
+    if shown is not None and not shown.is_set():
+        scheduler.call_later(FLASH_INTERVAL, _flash, bot, q, user, seq, pos, shown, owner=q.from_user.id)
+        return
+
+    if pos < len(seq):
+        shown = threading.Event()
+        bot.edit_message_text(
+            chat_id=q.message.chat.id,
+            message_id=q.message.message_id,
+            text=render_text(user, seq[pos]),
+            parse_mode="Markdown",
+            on_sent=shown.set
         )
-        time.sleep(0.30)  # flash speed
+        scheduler.call_later(FLASH_INTERVAL, _flash, bot, q, user, seq, pos + 1, shown, owner=q.from_user.id)
+        return
+
+    _ask_final(q, user, seq)
 
+
+def _ask_final(q, user, seq):
     # Count emojis
     counts = {e: seq.count(e) for e in EMOJIS}
-    final_emoji = seq[-1]
+    token = sessions.open("rush", q.from_user.id, RushRound(seq[-1], counts))
 
     # Ask for FINAL EMOJI
     keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton(e,
-            callback_data=f"rush_answer_final_{e}_{final_emoji}_{counts}"
-        ) for e in EMOJIS]
+        [InlineKeyboardButton(e, callback_data=f"rush_final_{token}_{i}") for i, e in enumerate(EMOJIS)]
     ])
 
     q.edit_message_text(
@@ -144,21 +176,22 @@ def _start_round(bot, update):
 # ---------------------------------------------------------
 # Process user answers
 # ---------------------------------------------------------
-def _process_answer(bot, update, answer_type, chosen, correct, counts_raw):
+def _process_answer(bot, update, answer_type, token, index):
     q = update.callback_query
     user_id = q.from_user.id
     user = get_user(user_id)
 
-    # Parse counts
-    counts_raw = counts_raw.replace("{", "").replace("}", "").replace("'", "")
-    parts = counts_raw.split(",")
-    counts = {}
-    for p in parts:
-        k, v = p.split(":")
-        counts[k.strip()] = int(v.strip())
+    # The final-emoji step keeps the round open; the count step closes it
+    if answer_type == "final":
+        round_ = sessions.get(token, "rush", user_id)
+    else:
+        round_ = sessions.take(token, "rush", user_id)
+    if round_ is None or not 0 <= index < len(EMOJIS):
+        return show_error(bot, update)
 
-    db = load_db()
-    uid = str(user_id)
+    counts = round_.counts
+    correct = round_.final
+    chosen = EMOJIS[index]
 
     # Correct final emoji?
     if answer_type == "final":
@@ -171,8 +204,8 @@ def _process_answer(bot, update, answer_type, chosen, correct, counts_raw):
 
             # Build count questions
             buttons = []
-            for e in EMOJIS:
-                cb = f"rush_answer_count_{counts[e]}_{counts[e]}_{counts}"
+            for i, e in enumerate(EMOJIS):
+                cb = f"rush_count_{token}_{i}"
                 buttons.append([InlineKeyboardButton(f"{e} = {counts[e]}", callback_data=cb)])
 
             buttons.append([InlineKeyboardButton("🏠 Menu", callback_data="menu_main")])
@@ -180,8 +213,9 @@ def _process_answer(bot, update, answer_type, chosen, correct, counts_raw):
             q.edit_message_text(text=text, parse_mode="Markdown", reply_markup=InlineKeyboardMarkup(buttons))
             return
         else:
-            db[uid]["xp"] = max(0, db[uid]["xp"] - RUSH_PENALTY)
-            save_db(db)
+            sessions.take(token, "rush", user_id)
+            with user_txn(user_id) as user:
+                award_xp(user_id, -RUSH_PENALTY, "rush")
 
             text = render_text(user, f"💥 WRONG!\nFinal emoji was *{correct}*\n−{RUSH_PENALTY} XP")
             q.edit_message_text(text=text, parse_mode="Markdown", reply_markup=_after_menu())
@@ -189,8 +223,8 @@ def _process_answer(bot, update, answer_type, chosen, correct, counts_raw):
 
     # Count question (always correct because choices are exact counts)
     if answer_type == "count":
-        db[uid]["xp"] += XP_CORRECT
-        save_db(db)
+        with user_txn(user_id) as user:
+            award_xp(user_id, XP_CORRECT, "rush")
 
         text = render_text(user,
             f"⚡ *AMAZING MEMORY!*\n"
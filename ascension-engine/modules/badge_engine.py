@@ -0,0 +1,120 @@
+"""
+modules/badge_engine.py
+Declarative badge rules for PWN Ascension Engine.
+
+Each badge is one BadgeRule: the record fields it reads, a progress
+value and the target that unlocks it. The same rule drives both the
+unlock check and the progress shown on the badge screen.
+
+Checks are incremental: callers (and the event subscribers below) pass
+the fields that just changed, and only rules reading those fields are
+evaluated. Rules already unlocked are skipped, so a grind costs a few
+dict lookups.
+"""
+
+from collections import namedtuple
+
+from database import user_txn
+from events import subscribe, emit, XpAwarded, GrindPerformed, BadgeUnlocked, WeeklyReset
+
+BadgeRule = namedtuple("BadgeRule", ["name", "description", "fields", "value", "target"])
+
+
+# ---------------------------------------------------------
+# RULES
+# ---------------------------------------------------------
+RULES = [
+    BadgeRule("Initiate", "Complete the onboarding calibration.",
+              ("onboarding_complete",), lambda u: int(bool(u.get("onboarding_complete"))), 1),
+    BadgeRule("Cracked", "Reach 10,000 XP.",
+              ("xp",), lambda u: u.get("xp", 0), 10000),
+    BadgeRule("Grinder", "Grind 50 times in one day.",
+              ("grinds_today",), lambda u: u.get("grinds_today", 0), 50),
+    BadgeRule("Keeper", "Keep a 30-day grind streak.",
+              ("streak",), lambda u: u.get("streak", 0), 30),
+    BadgeRule("No Life", "Reach 100,000 XP.",
+              ("xp",), lambda u: u.get("xp", 0), 100000),
+    BadgeRule("Dominator", "Finish a week in the XP Top 3.",
+              ("weekly",), lambda u: int(bool(u.get("weekly", {}).get("top3"))), 1),
+    BadgeRule("Quantum Master", "Land the Quantum Flip coin on its edge.",
+              ("quantum_edges",), lambda u: u.get("quantum_edges", 0), 1),
+]
+
+_RULES_BY_NAME = {rule.name: rule for rule in RULES}
+
+# field → rules that read it (the incremental index)
+_RULES_BY_FIELD = {}
+for _rule in RULES:
+    for _field in _rule.fields:
+        _RULES_BY_FIELD.setdefault(_field, []).append(_rule)
+
+
+# ---------------------------------------------------------
+# DEFINITIONS + PROGRESS (badge screens)
+# ---------------------------------------------------------
+def get_badge_definitions():
+    """Badge name → {"description", "target"} in display order."""
+    return {
+        rule.name: {"description": rule.description, "target": rule.target}
+        for rule in RULES
+    }
+
+
+def get_badge_progress(user, badge_name):
+    """Progress text for one badge, e.g. "1200/10000"."""
+    rule = _RULES_BY_NAME.get(badge_name)
+    if rule is None:
+        return "—"
+    return f"{min(rule.value(user), rule.target)}/{rule.target}"
+
+
+# ---------------------------------------------------------
+# UNLOCK CHECK
+# ---------------------------------------------------------
+def check_for_new_badges(user_id: int, fields=None):
+    """
+    Unlock every badge whose rule is now met. Only rules reading one of
+    `fields` are evaluated (None → all rules). Joins the caller's user_txn.
+    Returns the last newly unlocked badge name, or None.
+    """
+    if fields is None:
+        rules = RULES
+    else:
+        rules = [rule for field in fields for rule in _RULES_BY_FIELD.get(field, ())]
+    if not rules:
+        return None
+
+    new_badge = None
+    with user_txn(user_id) as user:
+        unlocked = user.setdefault("badges", [])
+        for rule in rules:
+            if rule.name in unlocked or rule.value(user) < rule.target:
+                continue
+            unlocked.append(rule.name)
+            weekly = user.setdefault("weekly", {})
+            weekly["badges"] = weekly.get("badges", 0) + 1
+            new_badge = rule.name
+            emit(BadgeUnlocked(user_id, rule.name))
+    return new_badge
+
+
+# ---------------------------------------------------------
+# EVENT SUBSCRIBERS
+# ---------------------------------------------------------
+def _on_xp_awarded(event):
+    if event.delta > 0:
+        check_for_new_badges(event.user_id, ("xp",))
+
+
+def _on_grind(event):
+    check_for_new_badges(event.user_id, ("grinds_today", "streak"))
+
+
+def _on_weekly_reset(event):
+    for uid in event.dominators:
+        check_for_new_badges(uid, ("weekly",))
+
+
+subscribe(XpAwarded, _on_xp_awarded, inline=True)
+subscribe(GrindPerformed, _on_grind, inline=True)
+subscribe(WeeklyReset, _on_weekly_reset)
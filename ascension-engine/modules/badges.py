@@ -11,12 +11,14 @@ Includes:
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from database import get_user
 from ui.components import render_text
-from modules.badges import get_badge_definitions, get_badge_progress
+from registry import register_callback
+from modules.badge_engine import get_badge_definitions, get_badge_progress
 
 
 # ---------------------------------------------------------
 # MAIN BADGES MENU
 # ---------------------------------------------------------
+@register_callback("badge")
 def handle_badges_callback(bot, update):
     query = update.callback_query
     data = query.data
@@ -5,10 +5,12 @@ Allows users to type /badges and open the badge UI instantly.
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from database import get_user
-from modules.badges import get_badge_definitions
+from modules.badge_engine import get_badge_definitions
 from ui.components import render_text
+from registry import register_command
 
 
+@register_command("/badges")
 def handle_badges_command(bot, update):
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
@@ -9,8 +9,12 @@ Purely a guessing / logic mini-game.
 
 import random
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import get_user, load_db, save_db
+from database import get_user, user_txn
+from modules.xp_ledger import award_xp
 from ui.components import render_text
+from registry import register_callback
+from sessions import sessions
+from modules.error_screen import show_error
 
 # XP rewards
 SAFE_XP = 150
@@ -20,6 +24,7 @@ FAIL_XP = 0
 # ---------------------------------------------------------
 # Callback handler
 # ---------------------------------------------------------
+@register_callback("game_bomb", "bomb")
 def handle_bomb_defusal_callback(bot, update):
     query = update.callback_query
     data = query.data
@@ -30,9 +35,10 @@ def handle_bomb_defusal_callback(bot, update):
     if data == "bomb_start":
         return _start_round(bot, update)
 
+    # bomb_pick_<token>_<bomb index>
     if data.startswith("bomb_pick_"):
-        chosen, correct = data.replace("bomb_pick_", "").split("_")
-        return _process_choice(bot, update, int(chosen), int(correct))
+        _, _, token, chosen = data.split("_")
+        return _process_choice(bot, update, token, int(chosen))
 
 
 # ---------------------------------------------------------
@@ -69,6 +75,7 @@ def _start_round(bot, update):
 
     # Pick safe bomb index
     safe_index = random.randint(0, 2)
+    token = sessions.open("bomb", query.from_user.id, safe_index)
 
     text = render_text(user,
         "💣💣💣\n\n"
@@ -82,7 +89,7 @@ def _start_round(bot, update):
         row.append(
             InlineKeyboardButton(
                 "💣",
-                callback_data=f"bomb_pick_{i}_{safe_index}"
+                callback_data=f"bomb_pick_{token}_{i}"
             )
         )
 
@@ -99,27 +106,35 @@ def _start_round(bot, update):
 # ---------------------------------------------------------
 # Process user selection
 # ---------------------------------------------------------
-def _process_choice(bot, update, chosen, safe_index):
+def _process_choice(bot, update, token, chosen):
     query = update.callback_query
     user_id = query.from_user.id
-    user = get_user(user_id)
 
-    db = load_db()
-    uid = str(user_id)
-
-    # Correct?
+    # One pick per round; expired / replayed buttons → error screen
+    safe_index = sessions.take(token, "bomb", user_id)
+    if safe_index is None:
+        return show_error(bot, update)
+
+    with user_txn(user_id) as user:
+        # Correct?
+        if chosen == safe_index:
+            award_xp(user_id, SAFE_XP, "bomb")
+        else:
+            # WRONG BOMB → Lose 5 XP (but never go below 0)
+            award_xp(user_id, -5, "bomb")
+
+    if chosen == safe_index:
+        text = render_text(user,
+            "✅ *DEFUSED!*\n\n"
+            "You picked the safe bomb.\n"
+            f"+{SAFE_XP} XP"
+        )
     else:
-    # WRONG BOMB → Lose 5 XP (but never go below 0)
-    current_xp = db[uid].get("xp", 0)
-    new_xp = max(0, current_xp - 5)
-    db[uid]["xp"] = new_xp
-    save_db(db)
-
-    text = render_text(user,
-        "💥 *BOOM!*\n\n"
-        "You picked an exploding bomb.\n"
-        "−5 XP"
-    )
+        text = render_text(user,
+            "💥 *BOOM!*\n\n"
+            "You picked an exploding bomb.\n"
+            "−5 XP"
+        )
 
     keyboard = InlineKeyboardMarkup([
         [InlineKeyboardButton("🔁 Play Again", callback_data="bomb_start")],
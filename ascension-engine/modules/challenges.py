@@ -4,16 +4,23 @@ Daily + Weekly challenge system for PWN Ascension.
 
 Handles:
 - Challenge definitions
-- Progress tracking
+- Progress tracking (per day / ISO week, rolled over lazily)
 - Completion bonuses
 - UI rendering
 """
 
 from datetime import datetime
-from database import load_db, save_db, get_user
+from database import get_user, user_txn
+from events import subscribe, XpAwarded, GrindPerformed, BadgeUnlocked
+from modules.leaderboard import week_key
+from modules.xp_ledger import award_xp
 from ui.components import render_text
+from registry import register_callback
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
+# XP source of challenge rewards
+REWARD_SOURCE = "challenge"
+
 
 # ---------------------------------------------------------
 # CHALLENGE DEFINITIONS
@@ -63,36 +70,118 @@ def get_challenge_definitions():
     }
 
 
+# Definitions indexed by metric: an update only touches its own challenges
+CHALLENGES = get_challenge_definitions()
+_BY_METRIC = {}
+for _section, _defs in CHALLENGES.items():
+    for _name, _c in _defs.items():
+        _BY_METRIC.setdefault(_name, []).append((_section, _name, _c))
+
+
+# ---------------------------------------------------------
+# PERIODS (lazy rollover: a stale period reads as empty)
+# ---------------------------------------------------------
+def _period_key(section, now=None):
+    now = now or datetime.utcnow()
+    if section == "daily":
+        return now.strftime("%Y-%m-%d")
+    return week_key(now)
+
+
+def _section_state(user, section, create=False):
+    """
+    Current period's state for a section:
+        {"period": "2025-W07", "progress": {metric: value}, "done": [name]}
+    A record from an older period (or the old format) counts as empty;
+    with create=True it is replaced in place.
+    """
+    period = _period_key(section)
+    challenges = user.get("challenges") or {}
+    state = challenges.get(section)
+    if isinstance(state, dict) and state.get("period") == period:
+        return state
+
+    state = {"period": period, "progress": {}, "done": []}
+    if create:
+        user.setdefault("challenges", {})[section] = state
+    return state
+
+
+def challenge_progress(user, metric):
+    """Current-period progress of one metric (0 if none yet)."""
+    for section, _name, _c in _BY_METRIC.get(metric, ()):
+        return _section_state(user, section)["progress"].get(metric, 0)
+    return 0
+
+
 # ---------------------------------------------------------
-# UPDATE CHALLENGE PROGRESS
-# (Called by grinding.py)
+# BATCHED PROGRESS UPDATE
 # ---------------------------------------------------------
-def update_challenge_progress(user_id, field, value):
-    db = load_db()
-    uid = str(user_id)
+def apply_challenge_metrics(user, metrics):
+    """
+    Record several metric values at once, e.g.
+        apply_challenge_metrics(user, {"grinds_today": 4, "grinds_week": 31})
+    Works on the record in hand (call it inside the user's transaction).
+    Returns the challenges completed by this update as [(title, reward_xp)];
+    each challenge completes at most once per period, so the caller grants
+    rewards exactly once.
+    """
+    completed = []
+    for metric, value in metrics.items():
+        for section, name, c in _BY_METRIC.get(metric, ()):
+            state = _section_state(user, section, create=True)
+            state["progress"][metric] = value
+
+            if value >= c["required"] and name not in state["done"]:
+                state["done"].append(name)
+                completed.append((c["title"], c["reward_xp"]))
+    return completed
+
+
+def _grant(user_id, user, metrics):
+    for _title, reward in apply_challenge_metrics(user, metrics):
+        award_xp(user_id, reward, REWARD_SOURCE)
+
 
-    if uid not in db:
+# ---------------------------------------------------------
+# EVENT SUBSCRIBERS (inline: join the emitter's transaction)
+# Progress is counted per period here, so it never depends on when
+# the daily / weekly counters elsewhere in the record are reset.
+# ---------------------------------------------------------
+def _count(user, metrics):
+    """metric → amount to add  ⇒  metric → new current-period value."""
+    return {metric: challenge_progress(user, metric) + n for metric, n in metrics.items()}
+
+
+def _on_xp_awarded(event):
+    # Rewards don't count toward XP challenges (one reward would chain the next)
+    if event.delta <= 0 or event.source == REWARD_SOURCE:
         return
+    with user_txn(event.user_id) as user:
+        _grant(event.user_id, user, _count(user, {"xp_today": event.delta, "xp_week": event.delta}))
+
 
-    user = db[uid]
-    challenges = user.setdefault("challenges", {
-        "daily": {},
-        "weekly": {}
-    })
+def _on_grind(event):
+    with user_txn(event.user_id) as user:
+        metrics = _count(user, {"grinds_today": 1, "grinds_week": 1})
+        metrics["streak_day"] = 1
+        _grant(event.user_id, user, metrics)
 
-    # Update both daily & weekly if field matches
-    if field in challenges["daily"]:
-        challenges["daily"][field]["current"] = value
 
-    if field in challenges["weekly"]:
-        challenges["weekly"][field]["current"] = value
+def _on_badge(event):
+    with user_txn(event.user_id) as user:
+        _grant(event.user_id, user, _count(user, {"badge_collector": 1}))
 
-    save_db(db)
+
+subscribe(XpAwarded, _on_xp_awarded, inline=True)
+subscribe(GrindPerformed, _on_grind, inline=True)
+subscribe(BadgeUnlocked, _on_badge, inline=True)
 
 
 # ---------------------------------------------------------
 # UI HANDLER
 # ---------------------------------------------------------
+@register_callback("ch")
 def handle_challenges_callback(bot, update):
     query = update.callback_query
     data = query.data
@@ -110,39 +199,28 @@ def handle_challenges_callback(bot, update):
 # ---------------------------------------------------------
 def _show_challenges(bot, update):
     query = update.callback_query
-    user = get_user(query.from_user.id)
-    db = load_db()
-
-    uid = str(query.from_user.id)
-    challenges = db[uid].setdefault("challenges", {"daily": {}, "weekly": {}})
-
-    defs = get_challenge_definitions()
-
-    # Initialize current challenge progress if missing
-    for section in ["daily", "weekly"]:
-        for cname, c in defs[section].items():
-            challenges[section].setdefault(cname, {
-                "current": 0,
-                "completed": False
-            })
+    user_id = query.from_user.id
+    user = get_user(user_id)
 
-    save_db(db)
+    # Read-only: an old period just shows as fresh progress
+    daily = _section_state(user, "daily")
+    weekly = _section_state(user, "weekly")
 
     # ---- BUILD TEXT ----
     text = "📅 *CHALLENGES*\n\n"
 
     text += "🔥 *DAILY CHALLENGES*\n"
-    for cname, c in defs["daily"].items():
-        prog = challenges["daily"][cname]["current"]
+    for cname, c in CHALLENGES["daily"].items():
+        prog = daily["progress"].get(cname, 0)
         req = c["required"]
-        status = "✅ Completed" if prog >= req else f"{prog}/{req}"
+        status = "✅ Completed" if cname in daily["done"] else f"{prog}/{req}"
         text += f"\n• *{c['title']}*\n  Progress: `{status}`\n"
 
     text += "\n🏆 *WEEKLY CHALLENGES*\n"
-    for cname, c in defs["weekly"].items():
-        prog = challenges["weekly"][cname]["current"]
+    for cname, c in CHALLENGES["weekly"].items():
+        prog = weekly["progress"].get(cname, 0)
         req = c["required"]
-        status = "✅ Completed" if prog >= req else f"{prog}/{req}"
+        status = "✅ Completed" if cname in weekly["done"] else f"{prog}/{req}"
         text += f"\n• *{c['title']}*\n  Progress: `{status}`\n"
 
     text = render_text(user, text)
@@ -9,8 +9,12 @@ XP varies by difficulty.
 
 import random
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import get_user, load_db, save_db
+from database import get_user, user_txn
+from modules.xp_ledger import award_xp
 from ui.components import render_text
+from registry import register_callback
+from sessions import sessions
+from modules.error_screen import show_error
 
 XP_SAME = 200      # Hardest prediction
 XP_NORMAL = 100    # Higher / Lower correct
@@ -20,6 +24,7 @@ XP_WRONG = 15      # Penalty
 # ---------------------------------------------------------
 # Callback Handler
 # ---------------------------------------------------------
+@register_callback("game_oracle", "oracle")
 def handle_oracle_callback(bot, update):
     q = update.callback_query
     data = q.data
@@ -27,9 +32,10 @@ def handle_oracle_callback(bot, update):
     if data == "game_oracle":
         return intro_screen(bot, update)
 
+    # oracle_guess_<token>_<higher|same|lower>
     if data.startswith("oracle_guess_"):
-        _, _, guess, original = data.split("_")
-        return process_guess(bot, update, guess, int(original))
+        _, _, token, guess = data.split("_")
+        return process_guess(bot, update, token, guess)
 
 
 # ---------------------------------------------------------
@@ -40,6 +46,7 @@ def intro_screen(bot, update):
     user = get_user(q.from_user.id)
 
     number = random.randint(1, 12)
+    token = sessions.open("oracle", q.from_user.id, number)
 
     text = render_text(
         user,
@@ -57,9 +64,9 @@ def intro_screen(bot, update):
 
     keyboard = InlineKeyboardMarkup([
         [
-            InlineKeyboardButton("🔼 Higher", callback_data=f"oracle_guess_higher_{number}"),
-            InlineKeyboardButton("🟰 Same", callback_data=f"oracle_guess_same_{number}"),
-            InlineKeyboardButton("🔽 Lower", callback_data=f"oracle_guess_lower_{number}"),
+            InlineKeyboardButton("🔼 Higher", callback_data=f"oracle_guess_{token}_higher"),
+            InlineKeyboardButton("🟰 Same", callback_data=f"oracle_guess_{token}_same"),
+            InlineKeyboardButton("🔽 Lower", callback_data=f"oracle_guess_{token}_lower"),
         ],
         [InlineKeyboardButton("↩️ Back", callback_data="games_main")]
     ])
@@ -70,21 +77,32 @@ def intro_screen(bot, update):
 # ---------------------------------------------------------
 # Process Guess
 # ---------------------------------------------------------
-def process_guess(bot, update, guess, original):
+def process_guess(bot, update, token, guess):
     q = update.callback_query
     user_id = q.from_user.id
-    user = get_user(user_id)
 
-    new_number = random.randint(1, 12)
+    # One guess per number; expired / replayed buttons → error screen
+    original = sessions.take(token, "oracle", user_id)
+    if original is None:
+        return show_error(bot, update)
 
-    db = load_db()
-    uid = str(user_id)
+    new_number = random.randint(1, 12)
 
     # Determine if correct
+    if new_number == original and guess == "same":
+        delta = XP_SAME
+    elif new_number > original and guess == "higher":
+        delta = XP_NORMAL
+    elif new_number < original and guess == "lower":
+        delta = XP_NORMAL
+    else:
+        delta = -XP_WRONG
+
+    with user_txn(user_id) as user:
+        award_xp(user_id, delta, "oracle")
+
     if new_number == original and guess == "same":
         # Hardest case
-        db[uid]["xp"] += XP_SAME
-        save_db(db)
         result = render_text(
             user,
             f"✨ *THE ORACLE SPEAKS...*\n\n"
@@ -95,8 +113,6 @@ def process_guess(bot, update, guess, original):
         )
 
     elif new_number > original and guess == "higher":
-        db[uid]["xp"] += XP_NORMAL
-        save_db(db)
         result = render_text(
             user,
             f"🔼 *CORRECT PREDICTION!*\n\n"
@@ -106,8 +122,6 @@ def process_guess(bot, update, guess, original):
         )
 
     elif new_number < original and guess == "lower":
-        db[uid]["xp"] += XP_NORMAL
-        save_db(db)
         result = render_text(
             user,
             f"🔽 *CORRECT PREDICTION!*\n\n"
@@ -118,8 +132,6 @@ def process_guess(bot, update, guess, original):
 
     else:
         # Wrong prediction
-        db[uid]["xp"] = max(0, db[uid]["xp"] - XP_WRONG)
-        save_db(db)
         result = render_text(
             user,
             f"💀 *THE ORACLE LAUGHS... WRONG!* 💀\n\n"
@@ -13,8 +13,12 @@ Streak increases difficulty slightly but XP stays controlled.
 
 import random
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import get_user, load_db, save_db
+from database import get_user, user_txn
+from modules.xp_ledger import award_xp
 from ui.components import render_text
+from registry import register_callback
+from sessions import sessions
+from modules.error_screen import show_error
 
 
 # ---------------------------------------------------------
@@ -38,6 +42,7 @@ STREAK_FACTOR = 0.03  # 3% bonus per streak day
 # ---------------------------------------------------------
 # Callback handler
 # ---------------------------------------------------------
+@register_callback("game_corridor", "door")
 def handle_dark_corridor_callback(bot, update):
     q = update.callback_query
     data = q.data
@@ -45,9 +50,10 @@ def handle_dark_corridor_callback(bot, update):
     if data == "game_corridor":
         return _intro(bot, update)
 
+    # door_pick_<token>_<door index>
     if data.startswith("door_pick_"):
-        _, _, door_index, depth = data.split("_")
-        return _resolve_choice(bot, update, int(door_index), int(depth))
+        _, _, token, door_index = data.split("_")
+        return _resolve_choice(bot, update, token, int(door_index))
 
 
 # ---------------------------------------------------------
@@ -68,14 +74,7 @@ def _intro(bot, update):
         "Streak slightly increases difficulty and reward."
     )
 
-    k = InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("🚪", callback_data="door_pick_0_0"),
-            InlineKeyboardButton("🚪", callback_data="door_pick_1_0"),
-            InlineKeyboardButton("🚪", callback_data="door_pick_2_0")
-        ],
-        [InlineKeyboardButton("↩️ Back", callback_data="games_main")]
-    ])
+    k = _door_keyboard(q.from_user.id, 0)
 
     q.edit_message_text(text=text, parse_mode="Markdown", reply_markup=k)
 
@@ -83,13 +82,16 @@ def _intro(bot, update):
 # ---------------------------------------------------------
 # Resolve door
 # ---------------------------------------------------------
-def _resolve_choice(bot, update, door, depth):
+def _resolve_choice(bot, update, token, door):
     q = update.callback_query
     user_id = q.from_user.id
-    user = get_user(user_id)
 
-    db = load_db()
-    uid = str(user_id)
+    # Depth lives server-side; each set of doors can be opened once
+    depth = sessions.take(token, "corridor", user_id)
+    if depth is None or not 0 <= door <= 2:
+        return show_error(bot, update)
+
+    user = get_user(user_id)
 
     streak = user.get("streak", 0)
 
@@ -98,7 +100,7 @@ def _resolve_choice(bot, update, door, depth):
 
     # Weighted RNG for outcomes
     outcomes = ["treasure", "trap", "teleport"]
-    
+
     # 5% chance for secret event
     if random.random() < 0.05:
         outcomes = ["secret"]
@@ -108,15 +110,84 @@ def _resolve_choice(bot, update, door, depth):
     outcome = outcomes[door] if len(outcomes) > 1 else "secret"
 
     # -------------------------
-    # TREASURE
+    # TELEPORT (no XP change)
     # -------------------------
+    if outcome == "teleport":
+        return _teleport(bot, update, user, depth + 1)
+
     if outcome == "treasure":
-        amount = random.randint(TREASURE_MIN, TREASURE_MAX)
-        amount = int(amount * multiplier)
+        amount = int(random.randint(TREASURE_MIN, TREASURE_MAX) * multiplier)
+    elif outcome == "trap":
+        amount = -int(random.randint(TRAP_MIN, TRAP_MAX) * multiplier)
+    else:
+        amount = int(random.randint(SECRET_MIN, SECRET_MAX) * multiplier)
 
-        db[uid]["xp"] += amount
-        save_db(db)
+    with user_txn(user_id) as user:
+        award_xp(user_id, amount, "corridor")
 
+    # -------------------------
+    # TREASURE
+    # -------------------------
+    if outcome == "treasure":
         text = render_text(user,
             f"💰 *TREASURE!*\n\n"
             f"You gained +{amount} XP.\n"
+            f"Depth reached: *{depth}*"
+        )
+
+    # -------------------------
+    # TRAP
+    # -------------------------
+    elif outcome == "trap":
+        text = render_text(user,
+            f"💀 *TRAP!*\n\n"
+            f"You lost {-amount} XP.\n"
+            f"Depth reached: *{depth}*"
+        )
+
+    # -------------------------
+    # SECRET
+    # -------------------------
+    else:
+        text = render_text(user,
+            f"✨ *SECRET ROOM!*\n\n"
+            f"A hidden stash: +{amount} XP."
+        )
+
+    keyboard = InlineKeyboardMarkup([
+        [InlineKeyboardButton("🚪 Enter Again", callback_data="game_corridor")],
+        [InlineKeyboardButton("🎮 Games", callback_data="games_main")],
+        [InlineKeyboardButton("🏠 Menu", callback_data="menu_main")],
+    ])
+
+    q.edit_message_text(text=text, parse_mode="Markdown", reply_markup=keyboard)
+
+
+# ---------------------------------------------------------
+# Teleport deeper (new set of doors)
+# ---------------------------------------------------------
+def _teleport(bot, update, user, depth):
+    q = update.callback_query
+
+    text = render_text(user,
+        f"🌀 *TELEPORT!*\n\n"
+        f"You are pulled deeper into the corridor.\n"
+        f"Depth: *{depth}* — rewards and traps grow stronger.\n\n"
+        "🚪  🚪  🚪"
+    )
+
+    k = _door_keyboard(q.from_user.id, depth)
+
+    q.edit_message_text(text=text, parse_mode="Markdown", reply_markup=k)
+
+
+def _door_keyboard(user_id, depth):
+    token = sessions.open("corridor", user_id, depth)
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton("🚪", callback_data=f"door_pick_{token}_0"),
+            InlineKeyboardButton("🚪", callback_data=f"door_pick_{token}_1"),
+            InlineKeyboardButton("🚪", callback_data=f"door_pick_{token}_2")
+        ],
+        [InlineKeyboardButton("↩️ Back", callback_data="games_main")]
+    ])
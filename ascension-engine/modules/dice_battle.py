@@ -7,8 +7,10 @@ User rolls → Bot rolls → Higher roll wins XP.
 
 import random
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import get_user, load_db, save_db
+from database import get_user, user_txn
+from modules.xp_ledger import award_xp
 from ui.components import render_text
+from registry import register_callback
 
 
 BATTLE_XP_WIN = 200
@@ -19,6 +21,7 @@ BATTLE_XP_DRAW = 100
 # ---------------------------------------------------------
 # UI entry point
 # ---------------------------------------------------------
+@register_callback("dice")
 def handle_dice_battle_callback(bot, update):
     query = update.callback_query
     data = query.data
@@ -67,7 +70,6 @@ def _start_battle(bot, update):
 def _roll_dice(bot, update):
     query = update.callback_query
     user_id = query.from_user.id
-    user = get_user(user_id)
 
     # Player roll
     user_roll = random.randint(1, 6)
@@ -81,21 +83,16 @@ def _roll_dice(bot, update):
     )
 
     # Determine result
-    db = load_db()
-    uid = str(user_id)
-
-    if user_roll > bot_roll:
-        text += "🏆 *YOU WIN!* +200 XP"
-        db[uid]["xp"] += BATTLE_XP_WIN
-    elif user_roll < bot_roll:
-        text += "😵 *You lost…* +50 XP"
-        db[uid]["xp"] += BATTLE_XP_LOSE
-    else:
-        text += "🤝 *Draw!* +100 XP"
-        db[uid]["xp"] += BATTLE_XP_DRAW
-
-    save_db(db)
-    user = get_user(user_id)
+    with user_txn(user_id) as user:
+        if user_roll > bot_roll:
+            text += "🏆 *YOU WIN!* +200 XP"
+            award_xp(user_id, BATTLE_XP_WIN, "dice")
+        elif user_roll < bot_roll:
+            text += "😵 *You lost…* +50 XP"
+            award_xp(user_id, BATTLE_XP_LOSE, "dice")
+        else:
+            text += "🤝 *Draw!* +100 XP"
+            award_xp(user_id, BATTLE_XP_DRAW, "dice")
 
     text = render_text(user, text)
 
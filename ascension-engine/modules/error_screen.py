@@ -5,12 +5,12 @@ Global fallback error message UI.
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from ui.components import render_text
-from database import get_user
+from database import peek_user
 
 
 def show_error(bot, update):
     query = update.callback_query
-    user = get_user(query.from_user.id)
+    user = peek_user(query.from_user.id) or {}
 
     text = render_text(user,
         "🟣 *ERROR*\n\n"
@@ -0,0 +1,42 @@
+"""
+modules/games.py
+Games hub — entry point for every mini-game (callback: games_main).
+"""
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from database import peek_user
+from ui.components import render_text
+from registry import register_callback
+
+
+# ---------------------------------------------------------
+# Callback Handler
+# ---------------------------------------------------------
+@register_callback("games", needs_user=False)
+def handle_games_callback(bot, update):
+    q = update.callback_query
+
+    # Static screen: theme only, no storage access
+    user = peek_user(q.from_user.id) or {}
+
+    text = render_text(
+        user,
+        "🎮 *GAMES*\n\n"
+        "Pick a game and put your XP on the line."
+    )
+
+    keyboard = InlineKeyboardMarkup([
+        [InlineKeyboardButton("🎲 Dice Battle", callback_data="dice_start"),
+         InlineKeyboardButton("⚛️ Quantum Flip", callback_data="game_quantum")],
+        [InlineKeyboardButton("🧠 Mind Hack", callback_data="game_mindhack"),
+         InlineKeyboardButton("❓ Quiz", callback_data="quiz_menu")],
+        [InlineKeyboardButton("🔮 Corrupted Oracle", callback_data="game_oracle"),
+         InlineKeyboardButton("💣 Bomb Defusal", callback_data="game_bomb")],
+        [InlineKeyboardButton("🚪 Dark Corridor", callback_data="game_corridor"),
+         InlineKeyboardButton("⚡ Ascension Rush", callback_data="game_rush")],
+        [InlineKeyboardButton("🌪 XP Typhoon", callback_data="game_typhoon"),
+         InlineKeyboardButton("👆 Tap Speed", callback_data="game_tapspeed")],
+        [InlineKeyboardButton("🏠 Menu", callback_data="menu_main")],
+    ])
+
+    q.edit_message_text(text=text, parse_mode="Markdown", reply_markup=keyboard)
@@ -7,8 +7,10 @@ from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from database import get_user
 from modules.grinding import perform_grind
 from ui.components import render_text
+from registry import register_command
 
 
+@register_command("/grind")
 def handle_grind_command(bot, update):
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
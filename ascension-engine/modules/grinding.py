@@ -15,9 +15,9 @@ Handles:
 import time
 from datetime import datetime
 
-from database import get_user, save_db, load_db, log_activity
-from modules.badges import check_for_new_badges
-from modules.challenges import update_challenge_progress
+from database import user_txn
+from events import emit, GrindPerformed
+from modules.xp_ledger import award_xp
 
 
 COOLDOWN_SECONDS = 30        # Time between allowed grinds
@@ -36,17 +36,16 @@ def perform_grind(user_id: int):
       ("rankup", new_rank)
       ("streak_milestone", streak_days)
       ("success", xp_gain)
-    """
 
-    db = load_db()
-    uid = str(user_id)
+    Runs as one user transaction: inline event subscribers (challenges,
+    badge rules) join it, so a grind is one read + one write.
+    Deferred subscribers (activity log) run after the commit.
+    """
+    with user_txn(user_id) as user:
+        return _apply_grind(user_id, user)
 
-    if uid not in db:
-        user = get_user(user_id)
-        db = load_db()
-    else:
-        user = db[uid]
 
+def _apply_grind(user_id, user):
     now = datetime.utcnow()
     now_ts = time.time()
 
@@ -67,9 +66,8 @@ def perform_grind(user_id: int):
     last_date = user.get("last_grind_date")
 
     if last_date != today_str:
-        # New day, reset daily counters
+        # New day, reset daily counters (xp_today rolls over in the XP ledger)
         user["grinds_today"] = 0
-        user["xp_today"] = 0
 
         # Determine streak:
         # If last grind was yesterday → continue streak
@@ -92,68 +90,35 @@ def perform_grind(user_id: int):
     # -----------------------------------------
     user["grinds_today"] += 1
     user["last_grind"] = now_ts
-    user["xp"] += GRIND_XP
-    user["xp_today"] = user.get("xp_today", 0) + GRIND_XP
+    badges_before = len(user.get("badges", []))
+
+    # XP, daily/weekly XP, rank and XP challenges
+    award = award_xp(user_id, GRIND_XP, "grind")
 
     # WEEKLY COUNTERS
-    weekly = user.get("weekly", {})
-    weekly["xp"] = weekly.get("xp", 0) + GRIND_XP
+    weekly = user.setdefault("weekly", {})
     weekly["grinds"] = weekly.get("grinds", 0) + 1
-    user["weekly"] = weekly
 
-    # Log activity
-    log_activity(user_id, f"Performed grind (+{GRIND_XP} XP)")
+    # Challenges, badges, activity log (event subscribers)
+    emit(GrindPerformed(user_id, GRIND_XP, user["grinds_today"], weekly["grinds"]))
 
     # -----------------------------------------
-    # CHALLENGES UPDATE
+    # BADGE CHECK (rules ran on the XP / grind events)
     # -----------------------------------------
-    update_challenge_progress(user_id, "grinds_today", user["grinds_today"])
-    update_challenge_progress(user_id, "xp_today", user["xp_today"])
-    update_challenge_progress(user_id, "xp_week", weekly["xp"])
-    update_challenge_progress(user_id, "grinds_week", weekly["grinds"])
-
-    save_db(db)
-
-    # -----------------------------------------
-    # BADGE CHECK
-    # -----------------------------------------
-    new_badge = check_for_new_badges(user_id)
-    if new_badge:
-        return ("badge", new_badge)
+    new_badges = user.get("badges", [])[badges_before:]
+    if new_badges:
+        return ("badge", new_badges[-1])
 
     # -----------------------------------------
     # STREAK MILESTONE
     # -----------------------------------------
     if user["streak"] in STREAK_MILESTONES:
-        save_db(db)
         return ("streak_milestone", user["streak"])
 
     # -----------------------------------------
     # RANK PROGRESSION
     # -----------------------------------------
-    new_rank = _calculate_rank(user["xp"])
-    if new_rank != user.get("rank"):
-        user["rank"] = new_rank
-        save_db(db)
-        return ("rankup", new_rank)
+    if award.rank != award.old_rank:
+        return ("rankup", award.rank)
 
-    save_db(db)
     return ("success", GRIND_XP)
-
-
-# ---------------------------------------------------------
-# INTERNAL: RANK CALCULATION
-# ---------------------------------------------------------
-def _calculate_rank(xp):
-    """Return the appropriate rank based on XP."""
-    if xp >= 10000:
-        return "Ascended"
-    if xp >= 5000:
-        return "Master"
-    if xp >= 2500:
-        return "Diamond"
-    if xp >= 1500:
-        return "Gold"
-    if xp >= 750:
-        return "Silver"
-    return "Bronze"
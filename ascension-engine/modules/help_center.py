@@ -12,17 +12,20 @@ Provides:
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from ui.components import render_text
-from database import get_user
+from registry import register_command, register_callback
+from database import peek_user
 
 
 # ---------------------------------------------------------
 # /help typed command
 # ---------------------------------------------------------
+@register_command("/help", needs_user=False)
 def handle_help_command(bot, update):
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
 
-    user = get_user(user_id)
+    # Static screen: theme only, no storage access
+    user = peek_user(user_id) or {}
     text, keyboard = _help_text_and_keyboard(user)
 
     bot.send_message(
@@ -36,11 +39,12 @@ def handle_help_command(bot, update):
 # ---------------------------------------------------------
 # Callback handler
 # ---------------------------------------------------------
+@register_callback("help", needs_user=False)
 def handle_help_callback(bot, update):
     query = update.callback_query
     user_id = query.from_user.id
 
-    user = get_user(user_id)
+    user = peek_user(user_id) or {}
     text, keyboard = _help_text_and_keyboard(user)
 
     query.edit_message_text(
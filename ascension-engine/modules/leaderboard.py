@@ -7,57 +7,77 @@ Tracks:
 - Badge count rankings
 - Weekly reset
 - Dominator badge flagging (Top 3)
+
+Rankings are served from leaderboard_index (kept current on every
+user write), so no screen scans or sorts the whole database.
 """
 
+import os
+import time
+import logging
+import threading
 from datetime import datetime, timedelta
-from database import load_db, save_db
+
+from database import get_meta, put_meta, user_ids, user_txn
+from leaderboard_index import index
+from events import emit, WeeklyReset
+from registry import register_callback
+
+logger = logging.getLogger(__name__)
 
 
 # ---------------------------------------------------------
 # GET LEADERBOARD: TOP XP
 # ---------------------------------------------------------
-def get_top_xp():
-    db = load_db()
-    weekly = {}
+def get_top(metric, k=3):
+    return index.top(metric, k)
 
-    for uid, user in db.items():
-        if isinstance(user, dict):
-            w = user.get("weekly", {})
-            weekly[uid] = w.get("xp", 0)
 
-    sorted_xp = sorted(weekly.items(), key=lambda x: x[1], reverse=True)
-    return sorted_xp[:3]
+def get_top_xp(k=3):
+    return index.top("xp", k)
 
 
 # ---------------------------------------------------------
 # GET LEADERBOARD: TOP GRINDS
 # ---------------------------------------------------------
-def get_top_grinds():
-    db = load_db()
-    weekly = {}
+def get_top_grinds(k=3):
+    return index.top("grinds", k)
 
-    for uid, user in db.items():
-        if isinstance(user, dict):
-            w = user.get("weekly", {})
-            weekly[uid] = w.get("grinds", 0)
 
-    sorted_grinds = sorted(weekly.items(), key=lambda x: x[1], reverse=True)
-    return sorted_grinds[:3]
+# ---------------------------------------------------------
+# GET LEADERBOARD: TOP BADGES
+# ---------------------------------------------------------
+def get_top_badge_collectors(k=3):
+    return index.top("badges", k)
 
 
 # ---------------------------------------------------------
-# GET LEADERBOARD: TOP BADGES
+# CALLER STANDING ("Your rank")
 # ---------------------------------------------------------
-def get_top_badge_collectors():
-    db = load_db()
-    badge_counts = {}
+def get_standing(metric, user_id, span=1):
+    """
+    Returns (rank, total, rows) for the caller, where rows are the
+    neighbours around them as [(rank, uid, score)]. rank is None if unranked.
+    """
+    return (
+        index.rank(metric, user_id),
+        index.size(metric),
+        index.around(metric, user_id, span),
+    )
+
 
-    for uid, user in db.items():
-        if isinstance(user, dict):
-            badge_counts[uid] = len(user.get("badges", []))
+def standing_text(metric, user_id, unit):
+    """Markdown block with the caller's position and their neighbours."""
+    rank, total, rows = get_standing(metric, user_id)
+    if rank is None:
+        return ""
 
-    sorted_badges = sorted(badge_counts.items(), key=lambda x: x[1], reverse=True)
-    return sorted_badges[:3]
+    uid = str(user_id)
+    text = f"\n📍 *Your rank:* #{rank} of {total}\n"
+    for pos, row_uid, score in rows:
+        marker = "👉 " if row_uid == uid else ""
+        text += f"{marker}{pos}. `{row_uid}` — {score} {unit}\n"
+    return text
 
 
 # ---------------------------------------------------------
@@ -65,49 +85,150 @@ def get_top_badge_collectors():
 # ---------------------------------------------------------
 def next_weekly_reset():
     now = datetime.utcnow()
-    days_until_monday = (7 - now.weekday()) % 7
+    days_until_monday = 7 - now.weekday()   # Monday → next Monday, never today
     next_mon = now + timedelta(days=days_until_monday)
     reset_time = next_mon.replace(hour=0, minute=0, second=0, microsecond=0)
     return reset_time
 
 
+def week_key(when):
+    """ISO week label, e.g. '2025-W07'."""
+    year, week, _ = when.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def last_finished_week():
+    """Label of the most recent week that is fully over."""
+    return week_key(datetime.utcnow() - timedelta(days=7))
+
+
 # ---------------------------------------------------------
-# WEEKLY RESET HANDLER
+# WEEKLY RESET JOB
 # ---------------------------------------------------------
-def handle_weekly_reset():
+RESET_STATE_KEY = "__weekly_reset__"
+RESET_CHUNK_SIZE = int(os.getenv("RESET_CHUNK_SIZE", "200"))
+RESET_CHUNK_PAUSE_MS = int(os.getenv("RESET_CHUNK_PAUSE_MS", "50"))
+STANDINGS_SIZE = 10
+
+_reset_lock = threading.Lock()
+
+
+def handle_weekly_reset(week=None):
     """
-    Resets weekly statistics and awards the Dominator flag
-    to the Top 3 XP players.
+    Closes `week` (default: the week that just ended): snapshots the
+    final standings, flags the Top 3 XP players as Dominators and
+    zeroes every user's weekly counters.
+
+    Runs in chunks of RESET_CHUNK_SIZE users, each user in its own
+    transaction, so live traffic is never blocked for long. Users who
+    are not cached are read and written straight through storage (the
+    hot cache stays as it is), and users with nothing to zero are not
+    written at all. The cursor is persisted after every chunk:
+    re-running after a crash resumes where it stopped, and re-running a
+    finished week does nothing. WeeklyReset is emitted once the users
+    are done, and the job only counts as finished after that, so a crash
+    in between still emits it on the next run.
     """
-
-    db = load_db()
-    top3 = get_top_xp()
-
-    # Award Dominator badge flag
-    for uid, _xp in top3:
-        if uid in db:
-            db[uid]["weekly"] = db[uid].get("weekly", {})
-            db[uid]["weekly"]["top3"] = True  # Badge engine will pick this up
-
-    # Reset all weekly stats
-    for uid, user in db.items():
-        if isinstance(user, dict):
-            user["weekly"] = {
-                "xp": 0,
-                "grinds": 0,
-                "badges": len(user.get("badges", [])),
-                "top3": False
+    week = week or last_finished_week()
+
+    with _reset_lock:
+        state = get_meta(RESET_STATE_KEY, {})
+
+        # Job records from before the "emitted" flag were emitted when done
+        if state.get("week") == week and state.get("emitted", state.get("done")):
+            return False
+
+        # New job → freeze standings before anything is zeroed
+        if state.get("week") != week:
+            state = {
+                "week": week,
+                "standings": {name: get_top(name, STANDINGS_SIZE) for name in index.metrics},
+                "dominators": [uid for uid, xp in get_top_xp(3) if xp > 0],
+                "cursor": None,
+                "done": False,
+                "emitted": False,
             }
+            put_meta(RESET_STATE_KEY, state)
+
+        pending = []
+        if not state["done"]:
+            dominators = set(state["dominators"])
+            pending = user_ids()
+            if state["cursor"] is not None:
+                pending = [uid for uid in pending if int(uid) > int(state["cursor"])]
+
+            for start in range(0, len(pending), RESET_CHUNK_SIZE):
+                chunk = pending[start:start + RESET_CHUNK_SIZE]
+                for uid in chunk:
+                    _reset_user(uid, week, uid in dominators)
+
+                state["cursor"] = chunk[-1]
+                put_meta(RESET_STATE_KEY, state)
+                time.sleep(RESET_CHUNK_PAUSE_MS / 1000)
 
-    db["next_reset"] = next_weekly_reset().strftime("%Y-%m-%d %H:%M:%S")
+            state["done"] = True
+            put_meta(RESET_STATE_KEY, state)
 
-    save_db(db)
+        # Subscribers are safe to run twice (badge checks skip unlocked badges)
+        emit(WeeklyReset(week, state["dominators"]))
+        state["emitted"] = True
+        put_meta(RESET_STATE_KEY, state)
+
+    logger.info(f"Weekly reset {week} done ({len(pending)} users)")
     return True
 
 
+def _reset_user(uid, week, dominator):
+    with user_txn(uid, cached=False) as user:
+        weekly = user.get("weekly", {})
+        if weekly.get("reset_week") == week:
+            return  # already reset by an interrupted run
+
+        badges = len(user.get("badges", []))
+        if (not dominator and not weekly.get("top3") and not weekly.get("xp")
+                and not weekly.get("grinds") and weekly.get("badges", 0) == badges):
+            return  # dormant: already what a reset would write
+
+        weekly = {"xp": 0, "grinds": 0, "badges": badges, "reset_week": week}
+        if dominator:
+            weekly["top3"] = True  # Badge engine will pick this up
+        user["weekly"] = weekly
+
+
+# ---------------------------------------------------------
+# WEEKLY RESET SCHEDULER
+# ---------------------------------------------------------
+def start_reset_scheduler():
+    """
+    Background thread that runs handle_weekly_reset() at every
+    next_weekly_reset(). On boot it first finishes an interrupted job
+    or catches up on a week missed while the bot was down.
+    """
+    state = get_meta(RESET_STATE_KEY)
+    if state is None:
+        # First boot: current counters belong to the running week
+        put_meta(RESET_STATE_KEY, {
+            "week": last_finished_week(), "standings": {}, "dominators": [],
+            "cursor": None, "done": True, "emitted": True,
+        })
+
+    def loop():
+        while True:
+            try:
+                handle_weekly_reset()
+            except Exception as e:
+                logger.error(f"Weekly reset failed: {e}")
+
+            delay = (next_weekly_reset() - datetime.utcnow()).total_seconds()
+            time.sleep(max(1, delay))
+
+    threading.Thread(target=loop, name="weekly-reset", daemon=True).start()
+
+
 # ---------------------------------------------------------
 # UI CALLBACK HANDLER (used by router)
 # ---------------------------------------------------------
+@register_callback("lb")
 def handle_leaderboard_callback(bot, update):
     query = update.callback_query
     data = query.data
@@ -124,28 +245,38 @@ def handle_leaderboard_callback(bot, update):
 
 
 # ---------------------------------------------------------
-# INTERNAL: Leaderboard Screens
+# TAB TEXT (straight from the index)
 # ---------------------------------------------------------
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import get_user
-from ui.components import render_text
+TOP_ROWS = 3
 
+TABS = {
+    "xp": ("🏆 *TOP XP*", "XP"),
+    "grinds": ("⚡ *TOP GRINDERS*", "grinds"),
+    "badges": ("🎖 *TOP BADGE COLLECTORS*", "badges"),
+}
 
-def _show_xp_leaderboard(bot, update):
-    query = update.callback_query
-    user = get_user(query.from_user.id)
 
-    top = get_top_xp()
+def top_text(metric):
+    """
+    The tab's top rows as Markdown. Read from the index on every call:
+    a top-K read is a slice of the first block, so no cache is needed
+    and every write is visible on the next screen.
+    """
+    _title, unit = TABS[metric]
+    rows = get_top(metric, TOP_ROWS)
+    return "".join(f"{n}. `{uid}` — {score} {unit}\n" for n, (uid, score) in enumerate(rows, 1))
+
 
-    text = "🏆 *TOP XP*\n\n"
-    rank = 1
-    for uid, xp in top:
-        text += f"{rank}. `{uid}` — {xp} XP\n"
-        rank += 1
+# ---------------------------------------------------------
+# INTERNAL: Leaderboard Screens
+# ---------------------------------------------------------
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from database import get_user
+from ui.components import render_text
 
-    text = render_text(user, text)
 
-    keyboard = InlineKeyboardMarkup([
+def _leaderboard_keyboard():
+    return InlineKeyboardMarkup([
         [
             InlineKeyboardButton("🔥 Top XP", callback_data="lb_xp"),
             InlineKeyboardButton("⚡ Top Grinds", callback_data="lb_grinds"),
@@ -154,68 +285,30 @@ def _show_xp_leaderboard(bot, update):
         [InlineKeyboardButton("🏠 Menu", callback_data="menu_main")]
     ])
 
-    query.edit_message_text(
-        text=text,
-        parse_mode="Markdown",
-        reply_markup=keyboard
-    )
-
 
-def _show_grinds_leaderboard(bot, update):
+def _show_leaderboard(bot, update, metric):
     query = update.callback_query
     user = get_user(query.from_user.id)
 
-    top = get_top_grinds()
-
-    text = "⚡ *TOP GRINDERS*\n\n"
-    rank = 1
-    for uid, gr in top:
-        text += f"{rank}. `{uid}` — {gr} grinds\n"
-        rank += 1
-
+    title, unit = TABS[metric]
+    text = title + "\n\n" + top_text(metric)
+    text += standing_text(metric, query.from_user.id, unit)
     text = render_text(user, text)
 
-    keyboard = InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("🔥 Top XP", callback_data="lb_xp"),
-            InlineKeyboardButton("⚡ Top Grinds", callback_data="lb_grinds"),
-            InlineKeyboardButton("🏅 Top Badges", callback_data="lb_badges"),
-        ],
-        [InlineKeyboardButton("🏠 Menu", callback_data="menu_main")]
-    ])
-
     query.edit_message_text(
         text=text,
         parse_mode="Markdown",
-        reply_markup=keyboard
+        reply_markup=_leaderboard_keyboard()
     )
 
 
-def _show_badges_leaderboard(bot, update):
-    query = update.callback_query
-    user = get_user(query.from_user.id)
-
-    top = get_top_badge_collectors()
+def _show_xp_leaderboard(bot, update):
+    return _show_leaderboard(bot, update, "xp")
 
-    text = "🎖 *TOP BADGE COLLECTORS*\n\n"
-    rank = 1
-    for uid, count in top:
-        text += f"{rank}. `{uid}` — {count} badges\n"
-        rank += 1
 
-    text = render_text(user, text)
+def _show_grinds_leaderboard(bot, update):
+    return _show_leaderboard(bot, update, "grinds")
 
-    keyboard = InlineKeyboardMarkup([
-        [
-            InlineKeyboardButton("🔥 Top XP", callback_data="lb_xp"),
-            InlineKeyboardButton("⚡ Top Grinds", callback_data="lb_grinds"),
-            InlineKeyboardButton("🏅 Top Badges", callback_data="lb_badges"),
-        ],
-        [InlineKeyboardButton("🏠 Menu", callback_data="menu_main")]
-    ])
 
-    query.edit_message_text(
-        text=text,
-        parse_mode="Markdown",
-        reply_markup=keyboard
-    )
+def _show_badges_leaderboard(bot, update):
+    return _show_leaderboard(bot, update, "badges")
@@ -5,25 +5,21 @@ Allows users to type /leaderboards to instantly open the XP leaderboard.
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from database import get_user
-from modules.leaderboard import get_top_xp, get_top_grinds, get_top_badge_collectors
+from modules.leaderboard import standing_text, top_text
 from ui.components import render_text
+from registry import register_command
 
 
+@register_command("/leaderboards")
 def handle_leaderboards_command(bot, update):
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
 
     user = get_user(user_id)
 
-    # Build XP leaderboard1 as default
-    top = get_top_xp()
-
-    text = "🏆 *WEEKLY LEADERBOARDS*\n\n"
-    rank = 1
-    for uid, xp in top:
-        text += f"{rank}. `{uid}` — {xp} XP\n"
-        rank += 1
-
+    # XP leaderboard as default
+    text = "🏆 *WEEKLY LEADERBOARDS*\n\n" + top_text("xp")
+    text += standing_text("xp", user_id, "XP")
     text = render_text(user, text)
 
     keyboard = InlineKeyboardMarkup([
@@ -6,11 +6,13 @@ Main Menu screen + /menu command
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from database import get_user
 from ui.components import render_text
+from registry import register_command, register_callback
 
 
 # ----------------------------------------------------
 # /menu command
 # ----------------------------------------------------
+@register_command("/menu")
 def handle_menu_command(bot, update):
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
@@ -31,6 +33,7 @@ def handle_menu_command(bot, update):
         [InlineKeyboardButton("📅 Challenges", callback_data="ch_main")],
         [InlineKeyboardButton("❓ Help", callback_data="help_main")],
         [InlineKeyboardButton("⚙️ Settings", callback_data="set_main")],
+        [InlineKeyboardButton("🎮 Games", callback_data="games_main")],
         [InlineKeyboardButton("🎲 Dice Battle", callback_data="dice_start")],
     ])
 
@@ -45,6 +48,7 @@ def handle_menu_command(bot, update):
 # ----------------------------------------------------
 # Menu button callback
 # ----------------------------------------------------
+@register_callback("menu")
 def handle_menu_callback(bot, update):
     query = update.callback_query
     user_id = query.from_user.id
@@ -66,6 +70,7 @@ def handle_menu_callback(bot, update):
         [InlineKeyboardButton("📅 Challenges", callback_data="ch_main")],
         [InlineKeyboardButton("❓ Help", callback_data="help_main")],
         [InlineKeyboardButton("⚙️ Settings", callback_data="set_main")],
+        [InlineKeyboardButton("🎮 Games", callback_data="games_main")],
     ])
 
     query.edit_message_text(
@@ -7,9 +7,14 @@ Fully dynamic, uses difficulty tiers and 20+ sequence patterns.
 """
 
 import random
+from collections import namedtuple
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import load_db, save_db, get_user
+from database import get_user, user_txn
+from modules.xp_ledger import award_xp
 from ui.components import render_text
+from registry import register_callback
+from sessions import sessions
+from modules.error_screen import show_error
 
 # XP values per difficulty
 XP = {
@@ -21,10 +26,14 @@ XP = {
 
 PENALTY = 12
 
+# Round state kept server-side (callback_data only carries the token)
+MindHackRound = namedtuple("MindHackRound", ["answers", "correct", "level"])
+
 
 # ----------------------------------------------------------
 # Entry point for callbacks
 # ----------------------------------------------------------
+@register_callback("game_mindhack", "mindhack")
 def handle_mindhack_callback(bot, update):
     query = update.callback_query
     data = query.data
@@ -35,9 +44,10 @@ def handle_mindhack_callback(bot, update):
     if data == "mindhack_start":
         return _generate_round(bot, update)
 
-    if data.startswith("mindhack_answer_"):
-        _, chosen, correct, level = data.split("_")
-        return _process_answer(bot, update, chosen, correct, level)
+    # mindhack_ans_<token>_<answer index>
+    if data.startswith("mindhack_ans_"):
+        _, _, token, index = data.split("_")
+        return _process_answer(bot, update, token, int(index))
 
 
 # ----------------------------------------------------------
@@ -91,6 +101,7 @@ def _generate_round(bot, update):
     ])
 
     seq, answers, correct = _generate_puzzle(puzzle_type, level)
+    token = sessions.open("mindhack", q.from_user.id, MindHackRound(answers, correct, level))
 
     # Format display
     text = render_text(user,
@@ -103,8 +114,8 @@ def _generate_round(bot, update):
     # Build answer buttons
     buttons = []
     row = []
-    for ans in answers:
-        cb = f"mindhack_answer_{ans}_{correct}_{level}"
+    for i, ans in enumerate(answers):
+        cb = f"mindhack_ans_{token}_{i}"
         row.append(InlineKeyboardButton(ans, callback_data=cb))
     buttons.append(row)
 
@@ -238,35 +249,37 @@ def _generate_puzzle(puzzle_type, level):
 # ----------------------------------------------------------
 # Answer Checker
 # ----------------------------------------------------------
-def _process_answer(bot, update, chosen, correct, level):
+def _process_answer(bot, update, token, index):
     q = update.callback_query
     user_id = q.from_user.id
-    user = get_user(user_id)
 
-    db = load_db()
-    uid = str(user_id)
+    # One answer per puzzle; expired / replayed buttons → error screen
+    round_ = sessions.take(token, "mindhack", user_id)
+    if round_ is None or not 0 <= index < len(round_.answers):
+        return show_error(bot, update)
+
+    chosen = round_.answers[index]
+    correct = round_.correct
+    level = round_.level
 
-    chosen = chosen
-    correct = correct
+    with user_txn(user_id) as user:
+        if chosen == correct:
+            award_xp(user_id, XP[level], "mindhack")
+        else:
+            award_xp(user_id, -PENALTY, "mindhack")
 
     # Correct
     if chosen == correct:
-        db[uid]["xp"] += XP[level]
-        save_db(db)
-
         text = render_text(user,
             f"🧠 *CORRECT!* 🎉\n\n"
             f"Difficulty: *{level.capitalize()}*\n"
             f"+{XP[level]} XP"
         )
     else:
-        db[uid]["xp"] = max(0, db[uid]["xp"] - PENALTY)
-        save_db(db)
-
         text = render_text(user,
-            f"❌ *WRONG!*  
-Correct: `{correct}`  
-−{PENALTY} XP"
+            f"❌ *WRONG!*\n"
+            f"Correct: `{correct}`\n"
+            f"−{PENALTY} XP"
         )
 
     keyboard = InlineKeyboardMarkup([
@@ -11,9 +11,11 @@ This module:
 """
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import load_db, save_db, get_user
+from database import get_user, user_txn
+from modules.xp_ledger import award_xp
 from ui.components import render_text
-from modules.badges import check_for_new_badges
+from registry import register_callback
+from modules.badge_engine import check_for_new_badges
 
 # XP gained per onboarding screen
 ONBOARDING_XP_REWARD = 100
@@ -22,6 +24,7 @@ ONBOARDING_XP_REWARD = 100
 # ---------------------------------------------------------
 # MAIN ENTRY (Triggered by router: "onb_*")
 # ---------------------------------------------------------
+@register_callback("onb")
 def handle_onboarding_callback(bot, update):
     query = update.callback_query
     data = query.data
@@ -49,48 +52,50 @@ def handle_onboarding_callback(bot, update):
 def _record_answer(bot, update, user_id, user, answer):
     query = update.callback_query
 
-    uid = str(user_id)
-    db = load_db()
+    with user_txn(user_id) as user:
+        # Save user's answer
+        step = user.get("onboarding_step", 1)
+        user[f"onb_step_{step}_answer"] = answer
 
-    # Save user's answer
-    step = user.get("onboarding_step", 1)
-    db[uid][f"onb_step_{step}_answer"] = answer
-
-    # Give XP
-    db[uid]["xp"] = db[uid].get("xp", 0) + ONBOARDING_XP_REWARD
+        # Give XP
+        award_xp(user_id, ONBOARDING_XP_REWARD, "onboarding")
 
-    save_db(db)
+        # Next (same transaction → answer + step saved together)
+        step = _bump_step(user_id, user)
 
-    # Next
-    user = get_user(user_id)
-    return _advance_step(bot, update, user_id, user)
+    return _show_after_step(bot, update, user_id, user, step)
 
 
 # ---------------------------------------------------------
 # INTERNAL: Move to next onboarding screen
 # ---------------------------------------------------------
 def _advance_step(bot, update, user_id, user):
-    query = update.callback_query
+    with user_txn(user_id) as user:
+        step = _bump_step(user_id, user)
+
+    return _show_after_step(bot, update, user_id, user, step)
 
-    uid = str(user_id)
-    db = load_db()
 
+def _bump_step(user_id, user):
+    """Advance the stored step; finishes onboarding after step 5."""
     step = user.get("onboarding_step", 1) + 1
-    db[uid]["onboarding_step"] = step
-    save_db(db)
+    user["onboarding_step"] = step
 
     # End of onboarding
     if step > 5:
-        db = load_db()
-        db[uid]["onboarding_complete"] = True
-        save_db(db)
+        user["onboarding_complete"] = True
 
         # Badge check (Initiate)
-        new_badge = check_for_new_badges(user_id)
+        check_for_new_badges(user_id, ("onboarding_complete",))
 
+    return step
+
+
+def _show_after_step(bot, update, user_id, user, step):
+    if step > 5:
         return _complete_screen(bot, update, user_id)
 
-    return _show_step(bot, update, user_id, get_user(user_id))
+    return _show_step(bot, update, user_id, user)
 
 
 # ---------------------------------------------------------
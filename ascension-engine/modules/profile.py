@@ -4,8 +4,9 @@ Profile screen, grind initiator, and power stats panel.
 """
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import get_user, save_db
+from database import get_user
 from ui.components import render_text
+from registry import register_command, register_callback
 
 # Grinding engine
 from modules.grinding import perform_grind
@@ -14,6 +15,7 @@ from modules.grinding import perform_grind
 # ----------------------------------------------------
 # Profile main screen
 # ----------------------------------------------------
+@register_command("/profile")
 def handle_profile_command(bot, update):
     """Handles /profile typed command."""
     chat_id = update.effective_chat.id
@@ -97,6 +99,7 @@ def _edit_profile(bot, query, user):
 # ----------------------------------------------------
 # Grind callback handler
 # ----------------------------------------------------
+@register_callback("prof")
 def handle_profile_callback(bot, update):
     query = update.callback_query
     data = query.data
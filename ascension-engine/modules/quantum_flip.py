@@ -10,19 +10,21 @@ Outcomes:
 
 import random
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import get_user, load_db, save_db
+from database import get_user, user_txn
+from modules.xp_ledger import award_xp
+from modules.badge_engine import check_for_new_badges
 from ui.components import render_text
+from registry import register_callback
 
 XP_HEADS = 100
 XP_TAILS = 20
 XP_EDGE = 500
 
-RARE_BADGE_NAME = "Quantum Master"
-
 
 # ---------------------------------------------------------
 # Callback Handler
 # ---------------------------------------------------------
+@register_callback("game_quantum", "quantum")
 def handle_quantum_callback(bot, update):
     q = update.callback_query
     data = q.data
@@ -65,38 +67,38 @@ def intro(bot, update):
 def flip(bot, update):
     q = update.callback_query
     user_id = q.from_user.id
-    user = get_user(user_id)
-
-    db = load_db()
-    uid = str(user_id)
 
     # 1% chance Edge
     edge_roll = random.random() < 0.01
 
-    if edge_roll:
-        db[uid]["xp"] += XP_EDGE
+    # 50/50 Heads or Tails
+    outcome = "edge" if edge_roll else random.choice(["heads", "tails"])
+
+    new_badge = None
+    with user_txn(user_id) as user:
+        if outcome == "edge":
+            award_xp(user_id, XP_EDGE, "quantum")
+
+            # Rare badge: unlocked by its badge rule on the first edge
+            user["quantum_edges"] += 1
+            new_badge = check_for_new_badges(user_id, ("quantum_edges",))
 
-        # Award rare badge if not already unlocked
-        if RARE_BADGE_NAME not in db[uid]["badges"]:
-            db[uid]["badges"].append(RARE_BADGE_NAME)
+        elif outcome == "heads":
+            award_xp(user_id, XP_HEADS, "quantum")
 
-        save_db(db)
+        else:
+            award_xp(user_id, -XP_TAILS, "quantum")
 
+    if edge_roll:
         text = render_text(
             user,
             "⚛️✨ *INCREDIBLE! THE COIN LANDED ON ITS EDGE!* ✨⚛️\n\n"
-            f"You gained *+{XP_EDGE} XP*.\n"
-            f"🎖️ Rare Badge Unlocked: *{RARE_BADGE_NAME}*"
+            f"You gained *+{XP_EDGE} XP*."
+            + (f"\n🎖️ Rare Badge Unlocked: *{new_badge}*" if new_badge else "")
         )
 
     else:
-        # 50/50 Heads or Tails
-        outcome = random.choice(["heads", "tails"])
-
         if outcome == "heads":
-            db[uid]["xp"] += XP_HEADS
-            save_db(db)
-
             text = render_text(
                 user,
                 "⚛️ *HEADS!* ⚛️\n\n"
@@ -104,9 +106,6 @@ def flip(bot, update):
             )
 
         else:
-            db[uid]["xp"] = max(0, db[uid]["xp"] - XP_TAILS)
-            save_db(db)
-
             text = render_text(
                 user,
                 "⚛️ *TAILS!* ⚛️\n\n"
@@ -10,14 +10,22 @@ Categories:
 """
 
 import random
+from collections import namedtuple
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import get_user, load_db, save_db
+from database import get_user, user_txn
+from modules.xp_ledger import award_xp
 from ui.components import render_text
+from registry import register_callback
+from sessions import sessions
+from modules.error_screen import show_error
 
 
 XP_CORRECT = 120
 XP_WRONG = 15
 
+# Round state kept server-side (callback_data only carries the token)
+QuizRound = namedtuple("QuizRound", ["category", "options", "correct"])
+
 
 # ---------------------------------------------------------
 # MASTER QUESTION BANK
@@ -104,6 +112,7 @@ QUESTIONS = {
 # ---------------------------------------------------------
 # MAIN CALLBACK HANDLER
 # ---------------------------------------------------------
+@register_callback("quiz")
 def handle_quiz_callback(bot, update):
     q = update.callback_query
     data = q.data
@@ -115,12 +124,13 @@ def handle_quiz_callback(bot, update):
     # Start category
     if data.startswith("quiz_start_"):
         _, _, category = data.split("_")
-        return send_question(bot, update, category)
+        if category in QUESTIONS:
+            return send_question(bot, update, category)
 
-    # Answer chosen
-    if data.startswith("quiz_answer_"):
-        _, _, choice, correct, category = data.split("_")
-        return check_answer(bot, update, choice, correct, category)
+    # Answer chosen: quiz_ans_<token>_<option index>
+    if data.startswith("quiz_ans_"):
+        _, _, token, index = data.split("_")
+        return check_answer(bot, update, token, int(index))
 
 
 # ---------------------------------------------------------
@@ -152,12 +162,13 @@ def send_question(bot, update, category):
     user = get_user(q.from_user.id)
 
     question, options, correct = random.choice(QUESTIONS[category])
+    token = sessions.open("quiz", q.from_user.id, QuizRound(category, options, correct))
 
     text = render_text(user, f"🧠 *{category.upper()} QUIZ*\n\n{question}")
 
     keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton(opt, callback_data=f"quiz_answer_{opt}_{correct}_{category}")]
-        for opt in options
+        [InlineKeyboardButton(opt, callback_data=f"quiz_ans_{token}_{i}")]
+        for i, opt in enumerate(options)
     ])
 
     q.edit_message_text(text=text, parse_mode="Markdown", reply_markup=keyboard)
@@ -166,26 +177,31 @@ def send_question(bot, update, category):
 # ---------------------------------------------------------
 # CHECK ANSWER
 # ---------------------------------------------------------
-def check_answer(bot, update, choice, correct, category):
+def check_answer(bot, update, token, index):
     q = update.callback_query
     user_id = q.from_user.id
-    user = get_user(user_id)
 
-    db = load_db()
-    uid = str(user_id)
+    # One answer per question; expired / replayed buttons → error screen
+    round_ = sessions.take(token, "quiz", user_id)
+    if round_ is None or not 0 <= index < len(round_.options):
+        return show_error(bot, update)
 
-    if choice == correct:
-        db[uid]["xp"] += XP_CORRECT
-        save_db(db)
+    choice = round_.options[index]
+    correct = round_.correct
+    category = round_.category
+
+    with user_txn(user_id) as user:
+        if choice == correct:
+            award_xp(user_id, XP_CORRECT, "quiz")
+        else:
+            award_xp(user_id, -XP_WRONG, "quiz")
 
+    if choice == correct:
         text = render_text(user,
             f"✅ *Correct!*\n+{XP_CORRECT} XP\n\n"
             "Next question?"
         )
     else:
-        db[uid]["xp"] = max(0, db[uid]["xp"] - XP_WRONG)
-        save_db(db)
-
         text = render_text(user,
             f"❌ *Wrong!* Correct answer: {correct}\n"
             f"Penalty: −{XP_WRONG} XP\n\nTry another?"
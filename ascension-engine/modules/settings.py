@@ -10,13 +10,15 @@ Features:
 """
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import load_db, save_db, get_user
+from database import get_user, user_txn, new_user_record, log_activity, clear_activity
 from ui.components import render_text
+from registry import register_callback
 
 
 # ---------------------------------------------------------
 # CALLBACK ENTRY
 # ---------------------------------------------------------
+@register_callback("set")
 def handle_settings_callback(bot, update):
     query = update.callback_query
     data = query.data
@@ -81,13 +83,10 @@ def _toggle_notifications(bot, update):
     query = update.callback_query
     user_id = query.from_user.id
 
-    db = load_db()
-    uid = str(user_id)
-
-    current = db[uid]["settings"].get("notifications", True)
-    db[uid]["settings"]["notifications"] = not current
-
-    save_db(db)
+    with user_txn(user_id) as user:
+        current = user["settings"].get("notifications", True)
+        user["settings"]["notifications"] = not current
+        log_activity(user_id, f"Notifications {'OFF' if current else 'ON'}", "settings")
 
     return _show_settings(bot, update)
 
@@ -99,13 +98,10 @@ def _toggle_theme(bot, update):
     query = update.callback_query
     user_id = query.from_user.id
 
-    db = load_db()
-    uid = str(user_id)
-
-    current = db[uid]["settings"].get("theme", "Dark")
-    db[uid]["settings"]["theme"] = "Light" if current == "Dark" else "Dark"
-
-    save_db(db)
+    with user_txn(user_id) as user:
+        current = user["settings"].get("theme", "Dark")
+        user["settings"]["theme"] = "Light" if current == "Dark" else "Dark"
+        log_activity(user_id, f"Theme: {user['settings']['theme']}", "settings")
 
     return _show_settings(bot, update)
 
@@ -159,37 +155,14 @@ def _reset_account(bot, update):
     query = update.callback_query
     user_id = query.from_user.id
 
-    uid = str(user_id)
-    db = load_db()
-
     # Full wipe of user data
-    db[uid] = {
-        "xp": 0,
-        "rank": "Bronze",
-        "streak": 0,
-        "grinds_today": 0,
-        "last_grind": 0,
-        "last_grind_date": None,
-        "badges": [],
-        "onboarding_step": 1,
-        "onboarding_complete": False,
-        "settings": {
-            "notifications": True,
-            "theme": "Dark",
-            "language": "English"
-        },
-        "activity": [],
-        "weekly": {
-            "xp": 0,
-            "grinds": 0,
-            "badges": 0,
-            "top3": False
-        },
-    }
-
-    save_db(db)
-
-    text = render_text(get_user(user_id),
+    with user_txn(user_id) as user:
+        user.clear()
+        user.update(new_user_record())
+    clear_activity(user_id)
+    log_activity(user_id, "Account reset", "settings")
+
+    text = render_text(user,
         "🧹 *ACCOUNT RESET SUCCESSFUL*\n\n"
         "You are brand new.\n"
         "Start fresh and rise again. ⚡"
@@ -6,9 +6,11 @@ Allows users to type /settings to instantly open Settings screen.
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from database import get_user
 from ui.components import render_text
+from registry import register_command
 from modules.settings import _show_settings
 
 
+@register_command("/settings")
 def handle_settings_command(bot, update):
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
@@ -6,11 +6,13 @@ Handles /start command + first-time welcome screen.
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from database import init_user, get_user
 from ui.components import render_text
+from registry import register_command
 
 
 # ---------------------------------------------------------
 # /start COMMAND
 # ---------------------------------------------------------
+@register_command("/start")
 def handle_start_command(bot, update):
     chat_id = update.effective_chat.id
     user_id = update.effective_user.id
@@ -8,8 +8,13 @@ User must tap within 1 second after receiving a "⚡ TAP NOW!" signal.
 import time
 import random
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import get_user, load_db, save_db
+from database import get_user, user_txn
+from modules.xp_ledger import award_xp
 from ui.components import render_text
+from registry import register_callback
+from scheduler import scheduler
+from sessions import sessions
+from modules.error_screen import show_error
 
 
 # XP tiers based on reaction time
@@ -22,6 +27,7 @@ XP_FAIL = 0        # >=1.0s or early tap
 # ---------------------------------------------------------
 # Callback handler
 # ---------------------------------------------------------
+@register_callback("game_tapspeed", "tapspeed")
 def handle_tap_speed_callback(bot, update):
     query = update.callback_query
     data = query.data
@@ -34,10 +40,9 @@ def handle_tap_speed_callback(bot, update):
     if data == "tapspeed_start":
         return _start_test(bot, update)
 
-    # User tapped
+    # User tapped: tapspeed_tap_<token>
     if data.startswith("tapspeed_tap_"):
-        timestamp = float(data.replace("tapspeed_tap_", ""))
-        return _process_tap(bot, update, timestamp)
+        return _process_tap(bot, update, data[len("tapspeed_tap_"):])
 
 
 # ---------------------------------------------------------
@@ -66,11 +71,12 @@ def _show_intro(bot, update):
 
 
 # ---------------------------------------------------------
-# Start test (waits 1–3 seconds randomly)
+# Start test (signal appears after 1.5–3 seconds randomly)
 # ---------------------------------------------------------
 def _start_test(bot, update):
     query = update.callback_query
-    user = get_user(query.from_user.id)
+    user_id = query.from_user.id
+    user = get_user(user_id)
     chat_id = query.message.chat.id
 
     # Tell user to wait
@@ -81,43 +87,53 @@ def _start_test(bot, update):
         parse_mode="Markdown",
     )
 
-    # Random wait between 1–3 seconds
+    # Random wait between 1.5–3 seconds — queued, no thread is held
     wait = random.uniform(1.5, 3.0)
-    time.sleep(wait)
+    scheduler.call_later(wait, _show_signal, bot, chat_id, query.message.message_id, user, user_id, owner=user_id)
 
-    # Mark timestamp of signal
-    signal_ts = time.time()
 
-    # Show TAP NOW with timestamp in callback_data
+def _show_signal(bot, chat_id, message_id, user, user_id):
+    # Signal time stays on the server; the button only carries the token.
+    # It is taken once the edit is delivered: the send queue may hold it
+    # back (rate limits), and that wait is not reaction time.
+    signal = {"shown_at": None}
+    token = sessions.open("tapspeed", user_id, signal)
+
+    def delivered():
+        signal["shown_at"] = time.monotonic()
+
     keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("⚡ TAP NOW!", callback_data=f"tapspeed_tap_{signal_ts}")]
+        [InlineKeyboardButton("⚡ TAP NOW!", callback_data=f"tapspeed_tap_{token}")]
     ])
 
     bot.edit_message_text(
         chat_id=chat_id,
-        message_id=query.message.message_id,
+        message_id=message_id,
         text=render_text(user, "⚡ *TAP NOW!*"),
         parse_mode="Markdown",
-        reply_markup=keyboard
+        reply_markup=keyboard,
+        on_sent=delivered
     )
 
 
 # ---------------------------------------------------------
 # Process user's tap
 # ---------------------------------------------------------
-def _process_tap(bot, update, signal_ts):
+def _process_tap(bot, update, token):
     query = update.callback_query
     user_id = query.from_user.id
-    user = get_user(user_id)
 
-    now = time.time()
-    reaction = now - signal_ts
+    now = time.monotonic()
+    signal = sessions.take(token, "tapspeed", user_id)
+    if signal is None:
+        return show_error(bot, update)
 
-    db = load_db()
-    uid = str(user_id)
+    # Signal still queued / in flight → the tap came before it was shown
+    shown_at = signal["shown_at"]
+    reaction = now - shown_at if shown_at is not None else None
 
     # Determine XP
-    if reaction < 0:  # tapped before the signal
+    if reaction is None:  # tapped before the signal
         xp = XP_FAIL
         msg = "⛔ You tapped too early!"
     elif reaction < 0.3:
@@ -134,12 +150,15 @@ def _process_tap(bot, update, signal_ts):
         msg = f"🐌 Too slow... {int(reaction*1000)}ms (+0 XP)"
 
     # Apply XP
-    db[uid]["xp"] += xp
-    save_db(db)
-    user = get_user(user_id)
+    with user_txn(user_id) as user:
+        award_xp(user_id, xp, "tapspeed")
 
     text = render_text(user, msg)
 
     keyboard = InlineKeyboardMarkup([
         [InlineKeyboardButton("🔁 Play Again", callback_data="tapspeed_start")],
-        [InlineKeyboardButton("🎮 Games", callback_data="_]()
+        [InlineKeyboardButton("🎮 Games", callback_data="games_main")],
+        [InlineKeyboardButton("🏠 Menu", callback_data="menu_main")],
+    ])
+
+    query.edit_message_text(text=text, parse_mode="Markdown", reply_markup=keyboard)
@@ -0,0 +1,86 @@
+"""
+modules/xp_ledger.py
+Single entry point for every XP change (grinds, games, onboarding, rewards).
+
+award_xp() applies, in the caller's user transaction (one write):
+- total XP (never below 0)
+- XP earned today / this week (gains only)
+- rank
+- per-source history for analytics:
+      user["xp_sources"][source] = [gained, lost, times]
+and emits XpAwarded (XP challenges subscribe to it, see events.py).
+Leaderboard indexes follow automatically through the database write hook.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+
+from database import user_txn
+from events import emit, XpAwarded
+
+# Result of one award
+XpAward = namedtuple("XpAward", ["delta", "xp", "old_rank", "rank"])
+
+
+# ---------------------------------------------------------
+# AWARD XP
+# ---------------------------------------------------------
+def award_xp(user_id: int, amount: int, source: str):
+    """
+    Add (or with a negative amount, remove) XP for `source`.
+    Joins the caller's user_txn if one is open. Returns an XpAward;
+    `award.rank != award.old_rank` means the user ranked up (or down).
+    """
+    with user_txn(user_id) as user:
+        old_xp = user.get("xp", 0)
+        new_xp = max(0, old_xp + amount)
+        delta = new_xp - old_xp
+        user["xp"] = new_xp
+
+        gained = max(delta, 0)
+        if gained:
+            _add_earned(user, gained)
+
+        # Per-source history
+        history = user.setdefault("xp_sources", {}).setdefault(source, [0, 0, 0])
+        history[0] += gained
+        history[1] += max(-delta, 0)
+        history[2] += 1
+
+        old_rank = user.get("rank", "Bronze")
+        rank = rank_for_xp(new_xp)
+        user["rank"] = rank
+
+        emit(XpAwarded(user_id, delta, new_xp, old_rank, rank, source))
+
+    return XpAward(delta, new_xp, old_rank, rank)
+
+
+def _add_earned(user, gained):
+    # Daily counter rolls over on the first award of a new day
+    today = datetime.utcnow().strftime("%Y-%m-%d")
+    if user.get("xp_today_date") != today:
+        user["xp_today_date"] = today
+        user["xp_today"] = 0
+    user["xp_today"] = user.get("xp_today", 0) + gained
+
+    weekly = user.setdefault("weekly", {})
+    weekly["xp"] = weekly.get("xp", 0) + gained
+
+
+# ---------------------------------------------------------
+# RANK CALCULATION
+# ---------------------------------------------------------
+def rank_for_xp(xp):
+    """Return the appropriate rank based on XP."""
+    if xp >= 10000:
+        return "Ascended"
+    if xp >= 5000:
+        return "Master"
+    if xp >= 2500:
+        return "Diamond"
+    if xp >= 1500:
+        return "Gold"
+    if xp >= 750:
+        return "Silver"
+    return "Bronze"
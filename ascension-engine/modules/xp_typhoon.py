@@ -6,21 +6,38 @@ Goal:
 • User taps as fast as possible during a storm
 • More taps = more XP
 • Storm lasts 5 seconds
+
+Taps are counted server-side against the storm deadline; the on-screen
+counter refreshes at most every REFRESH_INTERVAL and XP is settled once
+when the storm ends. Leaving the game mid-storm forfeits it: no XP.
 """
 
 import time
+import logging
+import threading
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from database import get_user, load_db, save_db
+from database import get_user, user_lock, user_txn
+from modules.xp_ledger import award_xp
 from ui.components import render_text
+from registry import register_callback
+from scheduler import scheduler
 
 STORM_DURATION = 5        # seconds
 XP_PER_TAP = 4            # XP awarded per tap
 PENALTY_SMALL = 5         # XP loss if < 3 taps
+REFRESH_INTERVAL = 0.4    # seconds between on-screen counter updates
+
+logger = logging.getLogger(__name__)
+
+# Running storms: user_id → session (taps are counted here, not in callback_data)
+_storms = {}
+_storms_lock = threading.Lock()
 
 
 # ---------------------------------------------------------
 # Callback Handler
 # ---------------------------------------------------------
+@register_callback("game_typhoon", "typhoon")
 def handle_typhoon_callback(bot, update):
     q = update.callback_query
     data = q.data
@@ -28,13 +45,15 @@ def handle_typhoon_callback(bot, update):
     if data == "game_typhoon":
         return intro_screen(bot, update)
 
-    if data.startswith("typhoon_start_"):
-        _, _, tcount = data.split("_")
-        return typhoon_tap(bot, update, int(tcount))
+    if data == "typhoon_go":
+        return start_storm(bot, update)
+
+    if data == "typhoon_tap":
+        return typhoon_tap(bot, update)
 
-    if data.startswith("typhoon_done_"):
-        _, _, taps = data.split("_")
-        return typhoon_finish(bot, update, int(taps))
+    if data == "typhoon_stop":
+        if not typhoon_finish(bot, q.from_user.id):
+            return q.answer("🌪️ The storm is over.")
 
 
 # ---------------------------------------------------------
@@ -54,7 +73,7 @@ def intro_screen(bot, update):
     )
 
     keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("🌪️ START TYPHOON", callback_data="typhoon_start_0")],
+        [InlineKeyboardButton("🌪️ START TYPHOON", callback_data="typhoon_go")],
         [InlineKeyboardButton("↩️ Back", callback_data="games_main")]
     ])
 
@@ -62,26 +81,68 @@ def intro_screen(bot, update):
 
 
 # ---------------------------------------------------------
-# Tap Handler
+# Storm start
 # ---------------------------------------------------------
-def typhoon_tap(bot, update, taps):
+def start_storm(bot, update):
     q = update.callback_query
-    user = get_user(q.from_user.id)
+    user_id = q.from_user.id
+    user = get_user(user_id)
 
-    taps += 1  # user tapped one more time
+    storm = {
+        "taps": 0,
+        "shown": None,
+        "deadline": time.monotonic() + STORM_DURATION,
+        "refresh_at": 0.0,
+        "chat_id": q.message.chat.id,
+        "message_id": q.message.message_id,
+        "user": user,
+        "finish": None,
+    }
+
+    with _storms_lock:
+        _storms[user_id] = storm
+
+    _render_storm(bot, storm)
+    _arm_timers(bot, user_id, storm)
+
+    # Not owned by the user → survives the router's cancel_owner()
+    scheduler.call_later(STORM_DURATION, _expire, bot, user_id, storm)
+
+
+def _arm_timers(bot, user_id, storm):
+    """
+    (Re)schedule the storm's end and the next counter refresh.
+    The router cancels a user's timers on every update, so each typhoon
+    callback re-arms them; any other action leaves the game (storm forfeited).
+    """
+    now = time.monotonic()
+    storm["finish"] = scheduler.call_later(
+        max(0.0, storm["deadline"] - now), typhoon_finish, bot, user_id, owner=user_id
+    )
+    if storm["taps"] != storm["shown"]:
+        # Fixed refresh time → continuous tapping still refreshes once per interval
+        scheduler.call_later(max(0.0, storm["refresh_at"] - now), _refresh_storm, bot, user_id, owner=user_id)
 
-    text = render_text(user,
+
+def _render_storm(bot, storm):
+    taps = storm["taps"]
+    storm["shown"] = taps
+    storm["refresh_at"] = time.monotonic() + REFRESH_INTERVAL
+
+    text = render_text(storm["user"],
         "🌪️ *TAP TO STAY IN THE STORM!* 🌪️\n"
         f"Taps: *{taps}*\n\n"
         "Keep tapping! The typhoon rages…"
     )
 
     keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("⚡ TAP", callback_data=f"typhoon_start_{taps}")],
-        [InlineKeyboardButton("Stop", callback_data=f"typhoon_done_{taps}")]
+        [InlineKeyboardButton("⚡ TAP", callback_data="typhoon_tap")],
+        [InlineKeyboardButton("Stop", callback_data="typhoon_stop")]
     ])
 
-    q.edit_message_text(
+    bot.edit_message_text(
+        chat_id=storm["chat_id"],
+        message_id=storm["message_id"],
         text=text,
         parse_mode="Markdown",
         reply_markup=keyboard
@@ -89,29 +150,82 @@ def typhoon_tap(bot, update, taps):
 
 
 # ---------------------------------------------------------
-# Storm ends — give XP
+# Tap Handler (counts in memory, screen refresh is debounced)
 # ---------------------------------------------------------
-def typhoon_finish(bot, update, taps):
+def typhoon_tap(bot, update):
     q = update.callback_query
     user_id = q.from_user.id
-    user = get_user(user_id)
 
-    db = load_db()
-    uid = str(user_id)
+    with _storms_lock:
+        storm = _storms.get(user_id)
+        expired = storm is not None and time.monotonic() >= storm["deadline"]
+        if storm is not None and not expired:
+            storm["taps"] += 1
+
+    if storm is None:
+        return q.answer("🌪️ The storm is over.")
+
+    if expired:
+        # Still in the game at the deadline: settle, without this tap
+        typhoon_finish(bot, user_id)
+        return q.answer("🌪️ The storm is over.")
+
+    _arm_timers(bot, user_id, storm)
+    q.answer()
+
+
+def _refresh_storm(bot, user_id):
+    with _storms_lock:
+        storm = _storms.get(user_id)
+        if storm is None or storm["taps"] == storm["shown"]:
+            return
+
+    _render_storm(bot, storm)
+
+
+def _expire(bot, user_id, storm):
+    """
+    Deadline check that no update can cancel. If the storm's finish timer
+    was cancelled (the user went elsewhere) the storm is forfeited.
+    """
+    # Under the user's lock a tap has always re-armed its finish timer
+    with user_lock(user_id):
+        with _storms_lock:
+            if _storms.get(user_id) is not storm or not storm["finish"].cancelled:
+                return  # settled already, or settles on its own
+            del _storms[user_id]
+
+    logger.info(f"Typhoon forfeited by {user_id} after {storm['taps']} taps")
+
+
+# ---------------------------------------------------------
+# Storm ends — give XP (exactly once)
+# ---------------------------------------------------------
+def typhoon_finish(bot, user_id):
+    """Settle the running storm. Returns False if there was none."""
+    with _storms_lock:
+        storm = _storms.pop(user_id, None)
+    if storm is None:
+        return False  # already settled (Stop pressed, or timer fired)
+
+    scheduler.cancel_owner(user_id)
+    taps = storm["taps"]
 
     # XP Calculation
+    gained = taps * XP_PER_TAP
+    with user_txn(user_id) as user:
+        if taps < 3:
+            award_xp(user_id, -PENALTY_SMALL, "typhoon")
+        else:
+            award_xp(user_id, gained, "typhoon")
+
     if taps < 3:
-        db[uid]["xp"] = max(0, db[uid]["xp"] - PENALTY_SMALL)
-        save_db(db)
         result = render_text(user,
             f"💀 *TYPHOON OVERPOWERED YOU!*\n\n"
             f"You tapped only *{taps}* times.\n"
             f"Penalty: −{PENALTY_SMALL} XP"
         )
     else:
-        gained = taps * XP_PER_TAP
-        db[uid]["xp"] += gained
-        save_db(db)
         result = render_text(user,
             f"🔥 *YOU SURVIVED THE TYPHOON!* 🔥\n\n"
             f"Taps: *{taps}*\n"
@@ -119,9 +233,16 @@ def typhoon_finish(bot, update, taps):
         )
 
     keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("🔁 Play Again", callback_data="typhoon_start_0")],
+        [InlineKeyboardButton("🔁 Play Again", callback_data="typhoon_go")],
         [InlineKeyboardButton("🎮 Games", callback_data="games_main")],
         [InlineKeyboardButton("🏠 Menu", callback_data="menu_main")],
     ])
 
-    q.edit_message_text(result, parse_mode="Markdown", reply_markup=keyboard)
+    bot.edit_message_text(
+        chat_id=storm["chat_id"],
+        message_id=storm["message_id"],
+        text=result,
+        parse_mode="Markdown",
+        reply_markup=keyboard
+    )
+    return True
@@ -0,0 +1,329 @@
+"""
+outbound.py
+Rate-limit-aware outbound queue in front of the Telegram Bot.
+
+OutboundBot wraps a telegram.Bot and is passed to handlers in its place:
+- send_message / edit_message_text / edit_message_reply_markup are queued
+  and return immediately (handlers never use their return values)
+- a global token bucket and one bucket per chat keep us under Telegram's
+  flood limits instead of running into 429s
+- several pending edits of the same message collapse into the latest one
+- a 429 (RetryAfter) pauses that chat for `retry_after` and the call is
+  retried, so nothing is dropped
+- an edit identical to the last content sent to that message is skipped
+  and the pending callback query is just answered instead
+- calls for one chat are sent in order, one at a time; different chats
+  are sent in parallel by a few sender threads
+- a queued call may pass on_sent=fn: fn() runs on a sender thread once
+  the call is done (delivered, skipped as unchanged, or failed for good),
+  for games that time something from when the user actually sees it
+Every other Bot method is passed straight through.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+logger = logging.getLogger(__name__)
+
+# Telegram: ~30 messages/s overall, ~1 message/s sustained per chat
+OUTBOUND_GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", "30"))
+OUTBOUND_GLOBAL_BURST = float(os.getenv("OUTBOUND_GLOBAL_BURST", "30"))
+OUTBOUND_CHAT_RATE = float(os.getenv("OUTBOUND_CHAT_RATE", "1"))
+OUTBOUND_CHAT_BURST = float(os.getenv("OUTBOUND_CHAT_BURST", "8"))
+OUTBOUND_SENDERS = int(os.getenv("OUTBOUND_SENDERS", "8"))
+
+# Last-rendered content per message (bounded LRU)
+OUTBOUND_RENDER_CACHE = int(os.getenv("OUTBOUND_RENDER_CACHE", "10000"))
+
+QUEUED_METHODS = ("send_message", "edit_message_text", "edit_message_reply_markup")
+EDIT_METHODS = ("edit_message_text", "edit_message_reply_markup")
+
+
+# ---------------------------------------------------------
+# CALLBACK CONTEXT (set by the router around a callback handler)
+# ---------------------------------------------------------
+_callback = threading.local()
+
+
+def set_current_callback(query_id):
+    """Callback query being handled on this thread (None to clear)."""
+    _callback.query_id = query_id
+
+
+def _take_current_callback():
+    query_id = getattr(_callback, "query_id", None)
+    _callback.query_id = None
+    return query_id
+
+
+def _fingerprint(method, kwargs):
+    markup = kwargs.get("reply_markup")
+    return hash((
+        method,
+        kwargs.get("text"),
+        kwargs.get("parse_mode"),
+        markup.to_json() if markup is not None else None,
+    ))
+
+
+# ---------------------------------------------------------
+# TOKEN BUCKET
+# ---------------------------------------------------------
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_time(self, now):
+        """Seconds until one token is available (0 → available now)."""
+        self._refill(now)
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class _Chat:
+    __slots__ = ("jobs", "bucket", "blocked_until", "busy")
+
+    def __init__(self):
+        self.jobs = deque()
+        self.bucket = TokenBucket(OUTBOUND_CHAT_RATE, OUTBOUND_CHAT_BURST)
+        self.blocked_until = 0.0
+        self.busy = False        # a call for this chat is in flight
+
+
+class _Job:
+    __slots__ = ("method", "args", "kwargs", "edit_key", "on_sent")
+
+    def __init__(self, method, args, kwargs, edit_key):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.edit_key = edit_key
+        self.on_sent = []        # completion callbacks (coalesced jobs included)
+
+
+# ---------------------------------------------------------
+# OUTBOUND BOT
+# ---------------------------------------------------------
+class OutboundBot:
+    def __init__(self, bot, senders=OUTBOUND_SENDERS):
+        self.bot = bot
+        self._chats = {}                     # chat_id → _Chat
+        self._edits = {}                     # (chat_id, message_id) → pending _Job
+        self._rendered = OrderedDict()       # (chat_id, message_id) → fingerprint
+        self._global = TokenBucket(OUTBOUND_GLOBAL_RATE, OUTBOUND_GLOBAL_BURST)
+        self._cond = threading.Condition()
+        self._senders = ThreadPoolExecutor(max_workers=senders, thread_name_prefix="outbound")
+        self._running = True
+
+        # Metrics
+        self.queued = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.throttled = 0
+        self.retry_after = 0
+        self.failed = 0
+        self.unchanged = 0
+
+        threading.Thread(target=self._dispatch, name="outbound-dispatcher", daemon=True).start()
+
+    def __getattr__(self, name):
+        attr = getattr(self.bot, name)
+        if name in QUEUED_METHODS:
+            return lambda *args, **kwargs: self._enqueue(name, args, kwargs)
+        return attr
+
+    # ---------------------------------------------------------
+    # PRODUCER SIDE (handlers)
+    # ---------------------------------------------------------
+    def _enqueue(self, method, args, kwargs):
+        on_sent = kwargs.pop("on_sent", None)
+        chat_id = kwargs.get("chat_id", args[0] if args else None)
+        edit_key = None
+        if method in EDIT_METHODS and kwargs.get("message_id") is not None:
+            edit_key = (chat_id, kwargs["message_id"])
+
+        with self._cond:
+            # Same content as the message already shows → no API call
+            if edit_key and not self._remember_render(edit_key, _fingerprint(method, kwargs)):
+                self.unchanged += 1
+                query_id = _take_current_callback()
+                if query_id:
+                    self._submit(self._answer, query_id)
+                if on_sent:
+                    self._submit(self._notify, [on_sent])
+                return True
+
+            # Newer edit of a message still waiting → just replace its content
+            pending = self._edits.get(edit_key) if edit_key else None
+            if pending is not None and pending.method == method:
+                pending.args, pending.kwargs = args, kwargs
+                if on_sent:
+                    pending.on_sent.append(on_sent)
+                self.coalesced += 1
+                return True
+
+            job = _Job(method, args, kwargs, edit_key)
+            if on_sent:
+                job.on_sent.append(on_sent)
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = _Chat()
+            chat.jobs.append(job)
+            if edit_key:
+                self._edits[edit_key] = job
+            self.queued += 1
+            self._cond.notify()
+        return True
+
+    # ---------------------------------------------------------
+    # DISPATCHER (one thread picks, sender threads send)
+    # ---------------------------------------------------------
+    def _dispatch(self):
+        with self._cond:
+            while self._running or self._has_work():
+                now = time.monotonic()
+                wait = None
+
+                for chat_id, chat in list(self._chats.items()):
+                    if chat.busy:
+                        continue
+                    if not chat.jobs:
+                        del self._chats[chat_id]
+                        continue
+
+                    delay = max(chat.blocked_until - now, chat.bucket.wait_time(now), self._global.wait_time(now))
+                    if delay > 0:
+                        self.throttled += 1
+                        wait = delay if wait is None else min(wait, delay)
+                        continue
+
+                    job = chat.jobs.popleft()
+                    if job.edit_key:
+                        self._edits.pop(job.edit_key, None)
+                    chat.bucket.take()
+                    self._global.take()
+                    chat.busy = True
+                    self._submit(self._send, chat_id, chat, job)
+
+                self._cond.wait(wait)
+
+    def _submit(self, fn, *args):
+        try:
+            self._senders.submit(fn, *args)
+        except RuntimeError:
+            # Interpreter exiting: pools take no new work → send on this thread
+            fn(*args)
+
+    def _remember_render(self, edit_key, fingerprint):
+        """Record the content for a message; False if it is already showing it."""
+        if self._rendered.get(edit_key) == fingerprint:
+            self._rendered.move_to_end(edit_key)
+            return False
+        self._rendered[edit_key] = fingerprint
+        self._rendered.move_to_end(edit_key)
+        if len(self._rendered) > OUTBOUND_RENDER_CACHE:
+            self._rendered.popitem(last=False)
+        return True
+
+    def _answer(self, query_id):
+        try:
+            self.bot.answer_callback_query(query_id)
+        except TelegramError as e:
+            logger.error(f"answer_callback_query failed: {e}")
+
+    def _notify(self, callbacks):
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception as e:
+                logger.error(f"Outbound on_sent callback failed: {e}")
+
+    def _has_work(self):
+        return any(chat.jobs or chat.busy for chat in self._chats.values())
+
+    def _send(self, chat_id, chat, job):
+        try:
+            getattr(self.bot, job.method)(*job.args, **job.kwargs)
+            ok = True
+        except RetryAfter as e:
+            ok = None
+            retry = e.retry_after
+        except BadRequest as e:
+            # Content already on screen (e.g. cache evicted) → nothing to do
+            ok = "not modified" in str(e).lower()
+            if not ok:
+                logger.error(f"Outbound {job.method} to {chat_id} failed: {e}")
+        except TelegramError as e:
+            ok = False
+            logger.error(f"Outbound {job.method} to {chat_id} failed: {e}")
+
+        with self._cond:
+            chat.busy = False
+            if ok:
+                self.sent += 1
+            elif ok is None:
+                # Flood limit hit → pause this chat and retry the call first
+                self.retry_after += 1
+                chat.blocked_until = time.monotonic() + retry
+                newer = self._edits.get(job.edit_key) if job.edit_key else None
+                if newer is None:
+                    chat.jobs.appendleft(job)
+                    if job.edit_key:
+                        self._edits[job.edit_key] = job
+                else:
+                    newer.on_sent.extend(job.on_sent)
+            else:
+                self.failed += 1
+                # Unknown what the message shows now → never skip its next edit
+                if job.edit_key:
+                    self._rendered.pop(job.edit_key, None)
+            self._chats.setdefault(chat_id, chat)
+            self._cond.notify()
+
+        # Retried calls are not done yet
+        if ok is not None and job.on_sent:
+            self._notify(job.on_sent)
+
+    # ---------------------------------------------------------
+    # SHUTDOWN + METRICS
+    # ---------------------------------------------------------
+    def stop(self, timeout=10):
+        """Send what is still queued (up to `timeout` seconds), then stop."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+            while self._has_work() and time.monotonic() < deadline:
+                self._cond.wait(0.1)
+        self._senders.shutdown(wait=False)
+
+    def metrics(self):
+        with self._cond:
+            return {
+                "queue_depth": sum(len(chat.jobs) for chat in self._chats.values()),
+                "chats_waiting": sum(1 for chat in self._chats.values() if chat.jobs),
+                "queued": self.queued,
+                "sent": self.sent,
+                "coalesced": self.coalesced,
+                "throttled": self.throttled,
+                "retry_after": self.retry_after,
+                "failed": self.failed,
+                "unchanged_skipped": self.unchanged,
+            }
@@ -0,0 +1,74 @@
+"""
+registry.py
+Handler registry used by router.py.
+
+Modules register their own entry points:
+
+    @register_callback("lb")                 # lb_xp, lb_grinds, lb_badges…
+    def handle_leaderboard_callback(bot, update): ...
+
+    @register_callback("game_quantum")       # one exact callback
+    @register_command("/grind")
+    def ...
+
+Callback lookup is two dict hits: the exact callback data first, then
+the token before the first "_" (so "lb_xp" → "lb").
+
+needs_user=True makes the router create/load the user record before the
+handler runs. Static screens register with needs_user=False and never
+touch storage on their own.
+"""
+
+from collections import namedtuple
+
+Route = namedtuple("Route", ["handler", "needs_user", "key"])
+
+CALLBACK_ROUTES = {}
+COMMAND_ROUTES = {}
+
+
+# ---------------------------------------------------------
+# REGISTRATION DECORATORS
+# ---------------------------------------------------------
+def register_callback(*keys, needs_user=True):
+    """Route callback data (exact value or prefix token) to the handler."""
+    def decorator(fn):
+        for key in keys:
+            _add(CALLBACK_ROUTES, key, Route(fn, needs_user, key))
+        return fn
+    return decorator
+
+
+def register_command(*commands, needs_user=True):
+    """Route typed commands ("/grind") to the handler."""
+    def decorator(fn):
+        for command in commands:
+            _add(COMMAND_ROUTES, command, Route(fn, needs_user, command))
+        return fn
+    return decorator
+
+
+def _add(table, key, route):
+    existing = table.get(key)
+    if existing and existing.handler is not route.handler:
+        raise ValueError(f"Route '{key}' already registered by {existing.handler.__module__}")
+    table[key] = route
+
+
+# ---------------------------------------------------------
+# LOOKUP
+# ---------------------------------------------------------
+def callback_route(data):
+    """Route for callback data, or None."""
+    route = CALLBACK_ROUTES.get(data)
+    if route is None:
+        route = CALLBACK_ROUTES.get(data.split("_", 1)[0])
+    return route
+
+
+def command_route(text):
+    """Route for a typed command ("/grind@PwnBot extra" → "/grind"), or None."""
+    if not text.startswith("/"):
+        return None
+    command = text.split(maxsplit=1)[0].split("@", 1)[0]
+    return COMMAND_ROUTES.get(command)
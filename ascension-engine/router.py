@@ -1,5 +1,4 @@
 """
-from modules.dice_battle import handle_dice_battle_callback
 router.py
 Unified router for ALL Telegram updates (messages + callbacks)
 FULL VERSION WITH ALL COMMAND HANDLERS
@@ -9,41 +8,49 @@ import logging
 from telegram import Update
 from telegram.error import TelegramError
 
-# Core screens
-from modules.start import handle_start_command
-from modules.menu import handle_menu_command, handle_menu_callback
-from modules.profile import handle_profile_callback, handle_profile_command
-from modules.help_center import handle_help_command, handle_help_callback
+# Handler modules register their routes (and event subscribers) on import
+import modules.start
+import modules.menu
+import modules.profile
+import modules.help_center
+import modules.grind_command
+import modules.badges_command
+import modules.badges
+import modules.leaderboards_command
+import modules.leaderboard
+import modules.settings_command
+import modules.settings
+import modules.activity_command
+import modules.activity
+import modules.challenges
+import modules.badge_engine
+import modules.onboarding
+
+# Mini-games
+import modules.games
+import modules.dice_battle
+import modules.quantum_flip
+import modules.mind_hack
+import modules.quiz_game
+import modules.corrupted_oracle
+import modules.bomb_defusal
+import modules.dark_corridor
+import modules.ascension_rush
+import modules.xp_typhoon
+import modules.tap_speed
+
+from modules.menu import handle_menu_command
 from modules.error_screen import show_error
+from registry import callback_route, command_route
 
-# Grind
-from modules.grind_command import handle_grind_command
-from modules.grinding import handle_grind_callback
-
-# Badges
-from modules.badges_command import handle_badges_command
-from modules.badges import handle_badges_callback
-
-# Leaderboards
-from modules.leaderboards_command import handle_leaderboards_command
-from modules.leaderboard import handle_leaderboard_callback
-
-# Settings
-from modules.settings_command import handle_settings_command
-from modules.settings import handle_settings_callback
-
-# Activity
-from modules.activity_command import handle_activity_command
-from modules.activity import handle_activity_callback
-
-# Challenges
-from modules.challenges import handle_challenges_callback
+# Database
+from database import init_user, user_lock
 
-# Onboarding
-from modules.onboarding import handle_onboarding_callback
+# Delayed game actions
+from scheduler import scheduler
 
-# Database
-from database import init_user
+# Outbound: lets a skipped (unchanged) edit answer the callback instead
+from outbound import set_current_callback
 
 logger = logging.getLogger(__name__)
 
@@ -58,101 +65,59 @@ def handle_update(bot, update: Update):
         if not update:
             return
 
-        # =====================================================
-        # CALLBACK QUERY (inline button presses)
-        # =====================================================
-        if update.callback_query:
-            data = update.callback_query.data
-            user_id = update.callback_query.from_user.id
-            if data.startswith("dice_"):
-    return handle_dice_battle_callback(bot, update)
-
-
-            init_user(user_id)  # ensure user exists
+        sender = update.effective_user
+        if sender is None:
+            return _route(bot, update)
 
-            # ----- MENU -----
-            if data.startswith("menu"):
-                return handle_menu_callback(bot, update)
+        # Updates from the same user run one at a time;
+        # different users are processed fully in parallel.
+        with user_lock(sender.id):
+            # Any new action leaves the running game → drop its pending edits
+            scheduler.cancel_owner(sender.id)
+            return _route(bot, update)
 
-            # ----- PROFILE -----
-            if data.startswith("prof"):
-                return handle_profile_callback(bot, update)
-
-            # ----- GRIND -----
-            if data.startswith("grind"):
-                return handle_grind_callback(bot, update)
-
-            # ----- BADGES -----
-            if data.startswith("badge"):
-                return handle_badges_callback(bot, update)
-
-            # ----- LEADERBOARD -----
-            if data.startswith("lb_"):
-                return handle_leaderboard_callback(bot, update)
-
-            # ----- SETTINGS -----
-            if data.startswith("set_"):
-                return handle_settings_callback(bot, update)
-
-            # ----- ACTIVITY -----
-            if data.startswith("act_"):
-                return handle_activity_callback(bot, update)
-
-            # ----- CHALLENGES -----
-            if data.startswith("ch_"):
-                return handle_challenges_callback(bot, update)
-
-            # ----- ONBOARDING -----
-            if data.startswith("onb_"):
-                return handle_onboarding_callback(bot, update)
+    except TelegramError as te:
+        logger.error(f"Telegram error: {te}")
+    except Exception as e:
+        logger.error(f"Router error: {e}")
 
-            # ----- HELP -----
-            if data.startswith("help"):
-                return handle_help_callback(bot, update)
 
-            # Otherwise → error
+# ------------------------------------------------------
+# DISPATCH (runs under the sender's lock)
+# ------------------------------------------------------
+def _route(bot, update: Update):
+    # =====================================================
+    # CALLBACK QUERY (inline button presses)
+    # =====================================================
+    if update.callback_query:
+        query = update.callback_query
+        route = callback_route(query.data or "")
+
+        # Unknown / outdated button → error
+        if route is None:
             return show_error(bot, update)
 
-        # =====================================================
-        # MESSAGE HANDLING (commands)
-        # =====================================================
-        if update.message:
-            text = update.message.text or ""
-            user_id = update.message.from_user.id
-            init_user(user_id)
-
-            # ----- COMMANDS -----
-            if text == "/start":
-                return handle_start_command(bot, update)
-
-            if text == "/menu":
-                return handle_menu_command(bot, update)
-
-            if text == "/profile":
-                return handle_profile_command(bot, update)
-
-            if text == "/help":
-                return handle_help_command(bot, update)
-
-            if text == "/grind":
-                return handle_grind_command(bot, update)
-
-            if text == "/badges":
-                return handle_badges_command(bot, update)
-
-            if text == "/leaderboards":
-                return handle_leaderboards_command(bot, update)
-
-            if text == "/settings":
-                return handle_settings_command(bot, update)
-
-            if text == "/activity":
-                return handle_activity_command(bot, update)
-
-            # Default → open menu
+        if route.needs_user:
+            init_user(query.from_user.id)  # ensure user exists
+
+        set_current_callback(query.id)
+        try:
+            return route.handler(bot, update)
+        finally:
+            set_current_callback(None)
+
+    # =====================================================
+    # MESSAGE HANDLING (commands)
+    # =====================================================
+    if update.message:
+        text = update.message.text or ""
+        route = command_route(text)
+
+        # Default → open menu
+        if route is None:
+            init_user(update.message.from_user.id)
             return handle_menu_command(bot, update)
 
-    except TelegramError as te:
-        logger.error(f"Telegram error: {te}")
-    except Exception as e:
-        logger.error(f"Router error: {e}")
+        if route.needs_user:
+            init_user(update.message.from_user.id)
+        return route.handler(bot, update)
@@ -0,0 +1,169 @@
+"""
+scheduler.py
+Delayed actions without parking a worker thread.
+
+Handlers queue work for later instead of sleeping:
+
+    scheduler.call_later(2.1, _show_signal, query, owner=user_id)
+
+- One timer thread keeps a heap of due times; due actions are handed
+  to a small executor, so a slow Telegram call never delays other timers.
+- Every timer may have an owner (usually the user id). cancel_owner()
+  drops all of them, e.g. when the user leaves the game.
+- metrics() reports pending timers and how late they fired (timer lag).
+"""
+
+import os
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+TIMER_WORKERS = int(os.getenv("TIMER_WORKERS", "4"))
+
+
+class Timer:
+    __slots__ = ("due", "fn", "args", "owner", "cancelled")
+
+    def __init__(self, due, fn, args, owner):
+        self.due = due
+        self.fn = fn
+        self.args = args
+        self.owner = owner
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    def __init__(self, workers=TIMER_WORKERS):
+        self._heap = []                      # (due, seq, Timer)
+        self._seq = itertools.count()
+        self._owners = {}                    # owner → set(Timer)
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="timer-action")
+        self._thread = None
+        self._running = True
+
+        # Metrics
+        self.scheduled = 0
+        self.fired = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+    # ---------------------------------------------------------
+    # SCHEDULING
+    # ---------------------------------------------------------
+    def call_later(self, delay, fn, *args, owner=None):
+        """Run fn(*args) after `delay` seconds. Returns a cancellable Timer."""
+        timer = Timer(time.monotonic() + delay, fn, args, owner)
+
+        with self._cond:
+            if not self._running:
+                return timer
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+                self._thread.start()
+
+            heapq.heappush(self._heap, (timer.due, next(self._seq), timer))
+            if owner is not None:
+                self._owners.setdefault(owner, set()).add(timer)
+            self.scheduled += 1
+
+            # Wake the timer thread if this is now the earliest deadline
+            if self._heap[0][2] is timer:
+                self._cond.notify()
+
+        return timer
+
+    def cancel_owner(self, owner):
+        """Cancel every pending timer of `owner`. Returns how many."""
+        with self._cond:
+            timers = self._owners.pop(owner, ())
+            for timer in timers:
+                timer.cancel()
+            self.cancelled += len(timers)
+            return len(timers)
+
+    # ---------------------------------------------------------
+    # TIMER THREAD
+    # ---------------------------------------------------------
+    def _run(self):
+        with self._cond:
+            while self._running:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+
+                due, _seq, timer = self._heap[0]
+                now = time.monotonic()
+                if due > now:
+                    self._cond.wait(due - now)
+                    continue
+
+                heapq.heappop(self._heap)
+                if timer.cancelled:
+                    continue  # lazy deletion
+
+                if timer.owner is not None:
+                    owned = self._owners.get(timer.owner)
+                    if owned is not None:
+                        owned.discard(timer)
+                        if not owned:
+                            del self._owners[timer.owner]
+
+                lag_ms = (now - due) * 1000
+                self.last_lag_ms = lag_ms
+                if lag_ms > self.max_lag_ms:
+                    self.max_lag_ms = lag_ms
+                self.fired += 1
+
+                try:
+                    self._executor.submit(self._fire, timer)
+                except RuntimeError:
+                    # Interpreter exiting: pools take no new work → fire here
+                    self._fire(timer)
+
+    def _fire(self, timer):
+        if timer.cancelled:
+            return
+        try:
+            timer.fn(*timer.args)
+        except Exception as e:
+            with self._cond:
+                self.failed += 1
+            logger.error(f"Scheduled action failed: {e}")
+
+    # ---------------------------------------------------------
+    # SHUTDOWN + METRICS
+    # ---------------------------------------------------------
+    def stop(self):
+        """Drop pending timers and let running actions finish."""
+        with self._cond:
+            self._running = False
+            self._heap.clear()
+            self._owners.clear()
+            self._cond.notify()
+        self._executor.shutdown(wait=True)
+
+    def metrics(self):
+        with self._cond:
+            return {
+                "pending": sum(1 for _due, _seq, t in self._heap if not t.cancelled),
+                "scheduled": self.scheduled,
+                "fired": self.fired,
+                "cancelled": self.cancelled,
+                "failed": self.failed,
+                "last_lag_ms": round(self.last_lag_ms, 1),
+                "max_lag_ms": round(self.max_lag_ms, 1),
+            }
+
+
+scheduler = Scheduler()
@@ -0,0 +1,110 @@
+"""
+sessions.py
+Server-side game sessions for the mini-games.
+
+A game keeps its round state here and puts only a short opaque token
+in callback_data ("quiz_ans_9f3a1c2e_1"), so:
+- payloads stay far below Telegram's 64-byte limit
+- answers are never sent to the client, and a token works once
+  (take()), so replaying an old button does nothing
+- answer checks are a dict lookup instead of parsing callback_data
+
+Sessions expire after SESSION_TTL seconds. At most SESSION_MAX are kept
+(oldest dropped first), and each user has at most one open round per game.
+"""
+
+import os
+import time
+import secrets
+import threading
+from collections import OrderedDict, namedtuple
+
+SESSION_TTL = int(os.getenv("SESSION_TTL", "600"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "20000"))
+
+_Session = namedtuple("_Session", ["game", "user_id", "expires", "state"])
+
+
+class SessionStore:
+    def __init__(self, ttl=SESSION_TTL, max_sessions=SESSION_MAX):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()       # token → _Session (oldest first)
+        self._by_owner = {}                  # (game, user_id) → token
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.opened = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def open(self, game, user_id, state):
+        """Start a round; returns its token. Replaces the user's previous round."""
+        token = secrets.token_hex(4)
+        with self._lock:
+            while token in self._sessions:
+                token = secrets.token_hex(4)
+
+            old = self._by_owner.get((game, user_id))
+            if old is not None:
+                self._sessions.pop(old, None)
+
+            self._sessions[token] = _Session(game, user_id, time.monotonic() + self.ttl, state)
+            self._by_owner[(game, user_id)] = token
+            self.opened += 1
+            self._trim()
+        return token
+
+    def get(self, token, game, user_id):
+        """State of a live round owned by this user, or None."""
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None or session.game != game or session.user_id != user_id:
+                return None
+            if session.expires <= time.monotonic():
+                self._drop(token, session)
+                self.expired += 1
+                return None
+            return session.state
+
+    def take(self, token, game, user_id):
+        """Like get(), but closes the round: each token is answered once."""
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None or session.game != game or session.user_id != user_id:
+                return None
+            self._drop(token, session)
+            if session.expires <= time.monotonic():
+                self.expired += 1
+                return None
+            return session.state
+
+    def _drop(self, token, session):
+        del self._sessions[token]
+        if self._by_owner.get((session.game, session.user_id)) == token:
+            del self._by_owner[(session.game, session.user_id)]
+
+    def _trim(self):
+        # Uniform TTL → insertion order is expiry order
+        now = time.monotonic()
+        while self._sessions:
+            token, session = next(iter(self._sessions.items()))
+            if session.expires > now and len(self._sessions) <= self.max_sessions:
+                break
+            self._drop(token, session)
+            if session.expires <= now:
+                self.expired += 1
+            else:
+                self.evicted += 1
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "active": len(self._sessions),
+                "opened": self.opened,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
+
+
+sessions = SessionStore()
@@ -0,0 +1,113 @@
+"""
+tools/bench_user_record.py
+Memory + on-disk size of user records: legacy dict vs UserRecord.
+
+Builds N records of two shapes and reports bytes per user:
+- "one-tap": created by /start and never used again
+- "active":  XP, streak, badges, a changed setting, per-source XP history
+Resident size is measured with tracemalloc, storage size as compact JSON
+(what the sqlite / journal engines write).
+
+Run from the ascension-engine folder:
+    python tools/bench_user_record.py [users]
+"""
+
+import os
+import sys
+import json
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from user_record import UserRecord
+
+
+def legacy_record():
+    """The fully expanded dict every user used to get."""
+    return {
+        "xp": 0,
+        "rank": "Bronze",
+        "streak": 0,
+        "grinds_today": 0,
+        "last_grind": 0,
+        "last_grind_date": None,
+        "badges": [],
+        "onboarding_step": 1,
+        "onboarding_complete": False,
+        "settings": {
+            "notifications": True,
+            "theme": "Dark",
+            "language": "English"
+        },
+        "activity": [],
+        "weekly": {
+            "xp": 0,
+            "grinds": 0,
+            "badges": 0
+        },
+        "created_at": int(time.time())
+    }
+
+
+def make_active(user, i):
+    user["xp"] = 1200 + i
+    user["rank"] = "Silver"
+    user["streak"] = 4
+    user["grinds_today"] = 3
+    user["last_grind"] = time.time()
+    user["last_grind_date"] = "2025-02-10"
+    user["badges"].append("Initiate")
+    user["onboarding_step"] = 6
+    user["onboarding_complete"] = True
+    user["settings"]["theme"] = "Light"
+    user["weekly"]["xp"] = 450
+    user.setdefault("xp_sources", {})["grind"] = [450, 0, 9]
+    return user
+
+
+def measure(build, n):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    records = [build(i) for i in range(n)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    resident = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return records, resident / n
+
+
+def disk_bytes(records, encode):
+    total = sum(len(json.dumps(encode(r), separators=(",", ":"))) for r in records)
+    return total / len(records)
+
+
+def main(users=20000):
+    def new_record(_i):
+        user = UserRecord()
+        user["created_at"] = int(time.time())
+        return user
+
+    shapes = {
+        "one-tap": (lambda i: legacy_record(), new_record),
+        "active": (lambda i: make_active(legacy_record(), i), lambda i: make_active(new_record(i), i)),
+    }
+
+    print(f"{users} users per shape (bytes per user)\n")
+    print(f"{'shape':<9} {'':<11} {'memory':>9} {'on disk':>9}")
+    for shape, (build_legacy, build_typed) in shapes.items():
+        legacy, legacy_mem = measure(build_legacy, users)
+        legacy_disk = disk_bytes(legacy, lambda r: r)
+        del legacy
+
+        typed, typed_mem = measure(build_typed, users)
+        typed_disk = disk_bytes(typed, UserRecord.to_storage)
+        del typed
+
+        print(f"{shape:<9} {'dict':<11} {legacy_mem:>9.0f} {legacy_disk:>9.0f}")
+        print(f"{'':<9} {'UserRecord':<11} {typed_mem:>9.0f} {typed_disk:>9.0f}"
+              f"   (-{100 - 100 * typed_mem / legacy_mem:.0f}% mem, -{100 - 100 * typed_disk / legacy_disk:.0f}% disk)")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,59 @@
+"""
+tools/convert_snapshot.py
+Convert a database snapshot between codecs (json / compact / binary).
+
+The source format is detected automatically. A *.sqlite3 path on either
+side reads from / writes to the SQLite engine instead, which makes this
+the admin dump + restore tool as well.
+
+Run from the ascension-engine folder (stop the bot first):
+    python tools/convert_snapshot.py storage/database.json storage/database.bin binary
+    python tools/convert_snapshot.py storage/database.bin storage/database.json json
+    python tools/convert_snapshot.py storage/database.sqlite3 dump.json compact
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import (
+    SNAPSHOT_CODECS, SqliteBackend, detect_codec, load_snapshot, write_snapshot,
+)
+
+
+def _is_sqlite(path):
+    return path.endswith(".sqlite3")
+
+
+def convert(src, dst, codec="compact"):
+    start = time.perf_counter()
+    if _is_sqlite(src):
+        engine = SqliteBackend(src)
+        data = engine.load_all()
+        engine.close()
+        source = "sqlite"
+    else:
+        with open(src, "rb") as f:
+            source = detect_codec(f.read(16))
+        data = load_snapshot(src)
+    loaded = time.perf_counter()
+
+    if _is_sqlite(dst):
+        engine = SqliteBackend(dst)
+        engine.save_all(data)
+        engine.close()
+        codec = "sqlite"
+    else:
+        write_snapshot(dst, data, codec)
+    saved = time.perf_counter()
+
+    print(f"{src} ({source}) → {dst} ({codec}): {len(data)} records")
+    print(f"  load {loaded - start:.2f}s, save {saved - loaded:.2f}s, {os.path.getsize(dst) / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or (len(sys.argv) > 3 and sys.argv[3] not in SNAPSHOT_CODECS):
+        sys.exit(__doc__)
+    convert(*sys.argv[1:4])
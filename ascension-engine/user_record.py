@@ -0,0 +1,201 @@
+"""
+user_record.py
+Compact in-memory user record.
+
+UserRecord keeps the standard fields in __slots__ (no per-user dict of
+keys) and anything else in a small overflow dict. A field that still
+holds its default is not stored at all:
+- in memory the slot stays empty until read, so untouched nested
+  defaults (settings, weekly…) are never allocated
+- to_storage() writes only values that differ from DEFAULTS (for the
+  settings / weekly sub-dicts: only the keys that differ), so a user
+  who tapped /start once is a few bytes on disk
+
+It behaves like the dict it replaces (user["xp"], .get, .setdefault,
+.pop, .update, `in`, iteration, ==), so modules keep using it as one.
+"""
+
+import copy
+from collections.abc import Mapping, MutableMapping
+
+# Field → default (immutables are shared, containers are copied on first use)
+DEFAULTS = {
+    "xp": 0,
+    "rank": "Bronze",
+    "streak": 0,
+    "grinds_today": 0,
+    "last_grind": 0,
+    "last_grind_date": None,
+    "badges": [],
+    "onboarding_step": 1,
+    "onboarding_complete": False,
+    "settings": {
+        "notifications": True,
+        "theme": "Dark",
+        "language": "English"
+    },
+    "weekly": {
+        "xp": 0,
+        "grinds": 0,
+        "badges": 0
+    },
+    "xp_today": 0,
+    "xp_today_date": None,
+    "xp_sources": {},
+    "challenges": {},
+    "quantum_edges": 0,
+    "created_at": 0,
+}
+
+_MUTABLE = frozenset(name for name, value in DEFAULTS.items() if isinstance(value, (dict, list)))
+
+# Sub-dicts stored as a diff against their default (merged back on load)
+_NESTED = frozenset(name for name, value in DEFAULTS.items() if isinstance(value, dict) and value)
+
+
+class UserRecord(MutableMapping):
+    __slots__ = tuple(DEFAULTS) + ("_extra",)
+
+    xp: int
+    rank: str
+    streak: int
+    grinds_today: int
+    last_grind: float
+    last_grind_date: str
+    badges: list
+    onboarding_step: int
+    onboarding_complete: bool
+    settings: dict
+    weekly: dict
+    xp_today: int
+    xp_today_date: str
+    xp_sources: dict
+    challenges: dict
+    quantum_edges: int
+    created_at: int
+    _extra: dict        # fields outside DEFAULTS (None until needed)
+
+    def __init__(self, data=None):
+        self._extra = None
+        if data:
+            self.update(data)
+
+    # ---------------------------------------------------------
+    # STORAGE FORM
+    # ---------------------------------------------------------
+    @classmethod
+    def from_storage(cls, data):
+        """Build from a stored dict (elided or fully expanded)."""
+        record = cls()
+        for key, value in data.items():
+            if key in DEFAULTS:
+                if key in _NESTED and isinstance(value, dict):
+                    value = {**DEFAULTS[key], **value}
+                if value != DEFAULTS[key]:
+                    object.__setattr__(record, key, value)
+            else:
+                if record._extra is None:
+                    record._extra = {}
+                record._extra[key] = value
+        return record
+
+    def to_storage(self):
+        """Plain dict with only the values that differ from DEFAULTS."""
+        data = {}
+        for name, default in DEFAULTS.items():
+            value = getattr(self, name, default)
+            if value == default:
+                continue
+            if name in _NESTED and isinstance(value, dict):
+                value = {k: v for k, v in value.items() if k not in default or default[k] != v}
+            data[name] = value
+        if self._extra:
+            data.update(self._extra)
+        return data
+
+    # ---------------------------------------------------------
+    # MAPPING PROTOCOL
+    # ---------------------------------------------------------
+    def __getitem__(self, key):
+        if key in DEFAULTS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                default = DEFAULTS[key]
+                if key not in _MUTABLE:
+                    return default
+                # Caller may mutate it → give this record its own copy
+                value = copy.deepcopy(default)
+                object.__setattr__(self, key, value)
+                return value
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in DEFAULTS:
+            object.__setattr__(self, key, value)
+            return
+        if self._extra is None:
+            self._extra = {}
+        self._extra[key] = value
+
+    def __delitem__(self, key):
+        # Standard fields always exist: deleting one resets it to the default
+        if key in DEFAULTS:
+            try:
+                object.__delattr__(self, key)
+            except AttributeError:
+                pass
+            return
+        if self._extra is None:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __contains__(self, key):
+        return key in DEFAULTS or (self._extra is not None and key in self._extra)
+
+    def __iter__(self):
+        yield from DEFAULTS
+        if self._extra:
+            yield from list(self._extra)
+
+    def __len__(self):
+        return len(DEFAULTS) + (len(self._extra) if self._extra else 0)
+
+    def clear(self):
+        for name in DEFAULTS:
+            try:
+                object.__delattr__(self, name)
+            except AttributeError:
+                pass
+        self._extra = None
+
+    def __eq__(self, other):
+        if isinstance(other, UserRecord):
+            return self.to_storage() == other.to_storage()
+        if isinstance(other, Mapping):
+            return self.to_storage() == UserRecord.from_storage(other).to_storage()
+        return NotImplemented
+
+    __hash__ = None
+
+    def __deepcopy__(self, memo):
+        clone = UserRecord()
+        for name in DEFAULTS:
+            try:
+                value = getattr(self, name)
+            except AttributeError:
+                continue
+            if name in _MUTABLE:
+                value = copy.deepcopy(value, memo)
+            object.__setattr__(clone, name, value)
+        if self._extra:
+            clone._extra = copy.deepcopy(self._extra, memo)
+        return clone
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    def __repr__(self):
+        return f"UserRecord({self.to_storage()!r})"
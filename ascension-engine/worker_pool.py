@@ -0,0 +1,119 @@
+"""
+worker_pool.py
+Bounded worker pool that drains incoming Telegram updates off the
+webhook request thread.
+
+- Each update is routed to one worker by sender id, so updates from the
+  same user are handled in arrival order while different users run in
+  parallel.
+- Every worker queue is bounded: when full, submit() refuses the update
+  and the webhook answers 503, so Telegram retries later (backpressure).
+- stop() stops accepting new work and drains what is already queued.
+"""
+
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class WorkerPool:
+    def __init__(self, handler, workers=8, queue_size=256):
+        self.handler = handler
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in range(workers)]
+        self._threads = []
+        self._accepting = True
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.max_wait_ms = 0.0
+
+        for n, q in enumerate(self._queues):
+            t = threading.Thread(target=self._run, args=(q,), name=f"update-worker-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    # ---------------------------------------------------------
+    # PRODUCER SIDE (webhook thread)
+    # ---------------------------------------------------------
+    def submit(self, key, item):
+        """
+        Queue `item` on the worker owning `key` (sender id).
+        Returns False if the pool is stopping or that worker is full.
+        """
+        if not self._accepting:
+            return False
+
+        q = self._queues[hash(key) % len(self._queues)]
+        try:
+            q.put_nowait((time.monotonic(), item))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return False
+
+        with self._lock:
+            self.accepted += 1
+        return True
+
+    # ---------------------------------------------------------
+    # CONSUMER SIDE (worker threads)
+    # ---------------------------------------------------------
+    def _run(self, q):
+        while True:
+            entry = q.get()
+            if entry is _STOP:
+                return
+
+            queued_at, item = entry
+            wait_ms = (time.monotonic() - queued_at) * 1000
+
+            try:
+                self.handler(item)
+                ok = True
+            except Exception as e:
+                logger.error(f"Worker error: {e}")
+                ok = False
+
+            with self._lock:
+                self.processed += 1
+                if not ok:
+                    self.failed += 1
+                if wait_ms > self.max_wait_ms:
+                    self.max_wait_ms = wait_ms
+
+    # ---------------------------------------------------------
+    # SHUTDOWN + METRICS
+    # ---------------------------------------------------------
+    def stop(self, timeout=30):
+        """Stop accepting updates and wait for queued ones to finish."""
+        self._accepting = False
+        for q in self._queues:
+            q.put(_STOP)
+
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0, deadline - time.monotonic()))
+
+    def metrics(self):
+        depths = [q.qsize() for q in self._queues]
+        with self._lock:
+            return {
+                "accepting": self._accepting,
+                "workers": len(self._queues),
+                "queue_depth": sum(depths),
+                "max_queue_depth": max(depths),
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "processed": self.processed,
+                "failed": self.failed,
+                "max_wait_ms": round(self.max_wait_ms, 1),
+            }